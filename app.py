@@ -1,7 +1,41 @@
 # app.py - Integrated Marketing Strategy & Promotion Mix Tool
-import streamlit as st
+import atexit
+import contextlib
+import datetime
+import functools
+import os
+import threading
+import time
 import urllib.parse
 
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import engine
+import history
+import leads
+import link_health
+import memory_profile
+import metrics
+import pdf_export
+import scenarios
+import search
+import sensitivity
+import simulation
+from plan_state import ACTIVITIES, APP_MODES, FORCES, SEGMENTS, decode_plan, encode_plan
+from catalog import (
+    AUDIENCE_OPTIONS,
+    COMMUNICATION_TOOLS,
+    COMPETITIVE_FORCES,
+    DISTRIBUTION_CHANNELS,
+    FORCE_LEVELS,
+    MARKET_TYPES,
+    PRODUCT_STAGES,
+    PRODUCT_TYPES,
+    SEGMENTATION_OPTIONS,
+    thaw,
+)
+
 # Page configuration
 st.set_page_config(
     page_title="Marketing Strategy & Promotion Mix Tool",
@@ -10,8 +44,90 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Catalog indexes are built on first use and shared by every session. Once
+# the first page has rendered, a background thread builds them ahead of the
+# steps that need them; MARKETING_PREWARM=0 leaves them fully lazy.
+def build_indexes():
+    engine.prewarm()
+    search.search_index()
+    sensitivity.grid()
+
+@st.cache_resource
+def prewarm():
+    if os.environ.get('MARKETING_PREWARM', '1') == '0':
+        return None
+    thread = threading.Thread(target=build_indexes, name='catalog-prewarm', daemon=True)
+    thread.start()
+    return thread
+
+# Render metrics, served on MARKETING_METRICS_PORT when set
+@st.cache_resource
+def start_metrics_server():
+    port = os.environ.get('MARKETING_METRICS_PORT')
+    return metrics.serve(int(port)) if port else None
+
+start_metrics_server()
+ctx = get_script_run_ctx()
+metrics.REGISTRY.record_rerun(ctx.session_id if ctx else None)
+
+# Opt-in rerun memory profiling: MARKETING_MEMORY_PROFILE=1 adds a sidebar
+# panel, MARKETING_MEMORY_LOG=<path> also appends a JSON line per rerun
+@st.cache_resource
+def memory_profiler():
+    if os.environ.get('MARKETING_MEMORY_PROFILE', '0') == '0':
+        return None
+    # Build the shared indexes first so they don't count as session growth
+    build_indexes()
+    return memory_profile.MemoryProfiler(
+        window=int(os.environ.get('MARKETING_MEMORY_WINDOW', memory_profile.DEFAULT_WINDOW)),
+        top=int(os.environ.get('MARKETING_MEMORY_TOP', memory_profile.DEFAULT_TOP)),
+        log_path=os.environ.get('MARKETING_MEMORY_LOG')
+    )
+
+def render_memory_profile(report):
+    with st.sidebar.expander("🧠 Memory Profile", expanded=bool(report.growing_keys or report.growing_lines)):
+        st.caption(f"Rerun {report.rerun} · {report.traced / 2**20:.1f} MiB allocated since profiling began, "
+                   f"peak {report.peak / 2**20:.1f} MiB")
+        if report.growing_keys:
+            st.warning("Growing every rerun: " + ", ".join(f"`{key}`" for key in report.growing_keys))
+        for growth in report.growing_lines:
+            st.warning(f"`{growth.line}` allocated {growth.size_diff / 1024:+.1f} KiB, "
+                       f"growing for {growth.streak} reruns")
+        st.markdown("**Session state**")
+        st.dataframe(
+            [{'Key': key, 'KiB': round(size / 1024, 1)}
+             for key, size in sorted(report.state_sizes.items(), key=lambda item: -item[1])],
+            hide_index=True, width='stretch'
+        )
+        st.markdown("**Largest growth since the last rerun**")
+        st.dataframe(
+            [{'Line': growth.line, 'KiB': round(growth.size_diff / 1024, 1), 'Blocks': growth.count_diff,
+              'Streak': growth.streak} for growth in report.top_lines],
+            hide_index=True, width='stretch'
+        )
+
+profiler = memory_profiler()
+
+@contextlib.contextmanager
+def profiled_run(scope='script'):
+    # end() sits in a finally: st.rerun() raises out of the run it cuts short
+    run_ctx = get_script_run_ctx()
+    if not (profiler and run_ctx):
+        yield
+        return
+    profiler.begin(run_ctx.session_id)
+    try:
+        yield
+    finally:
+        report = profiler.end(run_ctx.session_id, st.session_state.items(), scope)
+    # Fragments can't write to the sidebar; their reports only go to the log and gauges
+    if report and scope == 'script':
+        render_memory_profile(report)
+
 # Custom CSS
-st.markdown("""
+@st.cache_resource
+def load_css():
+    return """
 <style>
     .resource-card {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -41,349 +157,77 @@ st.markdown("""
         background-color: #eff6ff;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-# Initialize session state
-if 'app_mode' not in st.session_state:
-    st.session_state.app_mode = 'Marketing Strategy'
-if 'step' not in st.session_state:
-    st.session_state.step = 1
-if 'product_type' not in st.session_state:
-    st.session_state.product_type = None
-if 'product_stage' not in st.session_state:
-    st.session_state.product_stage = None
-if 'market_type' not in st.session_state:
-    st.session_state.market_type = None
-if 'segmentation' not in st.session_state:
-    st.session_state.segmentation = []
-if 'competitive_forces' not in st.session_state:
-    st.session_state.competitive_forces = {}
-if 'distribution_config' not in st.session_state:
-    st.session_state.distribution_config = {'customization': None, 'market_concentration': None}
-if 'selected_channel' not in st.session_state:
-    st.session_state.selected_channel = None
-if 'target_audience' not in st.session_state:
-    st.session_state.target_audience = None
-if 'selected_activities' not in st.session_state:
-    st.session_state.selected_activities = []
-
-# Communication tools with resources
-COMMUNICATION_TOOLS = {
-    'Advertisements on TV/Newspaper/Magazines/Radio': {
-        'partner': 'Partly',
-        'customer': 'Largely',
-        'type': 'advertising',
-        'resources': []
-    },
-    'Social Media Advertising (Facebook/Instagram/LinkedIn)': {
-        'partner': 'Partly',
-        'customer': 'Largely',
-        'type': 'digital',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/facebook-ads/', 'icon': '🎨', 'desc': 'Facebook Ad Templates'},
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/instagram-posts/', 'icon': '🎨', 'desc': 'Instagram Post Templates'},
-            {'name': 'Meta Ads Manager', 'url': 'https://business.facebook.com/adsmanager', 'icon': '📱', 'desc': 'Create & Manage Ads'}
-        ]
-    },
-    'Point of Purchase Promotions in Retail Outlets': {
-        'partner': '',
-        'customer': 'Largely',
-        'type': 'sales-promotion',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/posters/', 'icon': '🎨', 'desc': 'POS Poster Templates'},
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/shelf-talkers/', 'icon': '🎨', 'desc': 'Shelf Talker Designs'}
-        ]
-    },
-    'Display Boards / Billboards': {
-        'partner': 'Partly',
-        'customer': 'Largely',
-        'type': 'advertising',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/billboards/', 'icon': '🎨', 'desc': 'Billboard Templates'},
-            {'name': 'Visme', 'url': 'https://www.visme.co/', 'icon': '📊', 'desc': 'Visual Design Tool'}
-        ]
-    },
-    'Pamphlets/Brochures/Flyers': {
-        'partner': 'Partly',
-        'customer': 'Largely',
-        'type': 'print',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/brochures/', 'icon': '🎨', 'desc': 'Brochure Templates'},
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/flyers/', 'icon': '🎨', 'desc': 'Flyer Templates'},
-            {'name': 'Visme', 'url': 'https://www.visme.co/brochure-maker/', 'icon': '📊', 'desc': 'Brochure Maker'},
-            {'name': 'Lucidpress', 'url': 'https://www.lucidpress.com/', 'icon': '📄', 'desc': 'Brand Templates'}
-        ]
-    },
-    'Email Marketing Campaigns': {
-        'partner': 'Partly',
-        'customer': 'Largely',
-        'type': 'digital',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/email-headers/', 'icon': '🎨', 'desc': 'Email Header Templates'},
-            {'name': 'Mailchimp', 'url': 'https://mailchimp.com/create/email-templates/', 'icon': '✉️', 'desc': 'Email Templates'},
-            {'name': 'Stripo', 'url': 'https://stripo.email/', 'icon': '✉️', 'desc': 'Email Designer'}
-        ]
-    },
-    'Video Marketing (YouTube/TikTok/Reels)': {
-        'partner': 'Partly',
-        'customer': 'Largely',
-        'type': 'digital',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/videos/', 'icon': '🎨', 'desc': 'Video Templates'},
-            {'name': 'InVideo', 'url': 'https://invideo.io/', 'icon': '🎥', 'desc': 'Video Creation Tool'},
-            {'name': 'CapCut', 'url': 'https://www.capcut.com/', 'icon': '✂️', 'desc': 'Video Editor'}
-        ]
-    },
-    'Trade Shows': {
-        'partner': 'Largely',
-        'customer': 'Partly',
-        'type': 'events',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/banners/', 'icon': '🎨', 'desc': 'Banner Templates'},
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/presentations/', 'icon': '🎨', 'desc': 'Presentation Templates'}
-        ]
-    },
-    'Fairs/Festivals/Movie Shows': {
-        'partner': 'Partly',
-        'customer': 'Largely',
-        'type': 'events',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/event-posters/', 'icon': '🎨', 'desc': 'Event Poster Templates'}
-        ]
-    },
-    'Sampling Events': {
-        'partner': '',
-        'customer': 'Largely',
-        'type': 'sales-promotion',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/invitations/', 'icon': '🎨', 'desc': 'Event Invitations'}
-        ]
-    },
-    'Trade Discount/Rebates': {
-        'partner': 'Largely',
-        'customer': 'Partly',
-        'type': 'sales-promotion',
-        'resources': []
-    },
-    'Loyalty Programs': {
-        'partner': 'Partly',
-        'customer': 'Largely',
-        'type': 'relationship',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/loyalty-cards/', 'icon': '🎨', 'desc': 'Loyalty Card Templates'}
-        ]
-    },
-    'Direct Mailing/Catalogues/Telemarketing': {
-        'partner': '',
-        'customer': 'Largely',
-        'type': 'direct',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/catalogs/', 'icon': '🎨', 'desc': 'Catalog Templates'}
-        ]
-    },
-    'Community Relations/CSR Drives': {
-        'partner': '',
-        'customer': 'Largely',
-        'type': 'pr',
-        'resources': [
-            {'name': 'Canva', 'url': 'https://www.canva.com/create/infographics/', 'icon': '🎨', 'desc': 'Infographic Templates'}
-        ]
+st.markdown(load_css(), unsafe_allow_html=True)
+
+# Session state defaults; a new session gets them, plus any plan shared through
+# the URL, in a single update. Reruns of an existing session skip this.
+WIZARD_KEYS = ('step', 'product_type', 'product_stage', 'market_type', 'segment_mask', 'forces_code',
+               'distribution_config', 'selected_channel')
+
+def session_defaults():
+    return {
+        'app_mode': 'Marketing Strategy',
+        'step': 1,
+        'product_type': None,
+        'product_stage': None,
+        'market_type': None,
+        'segment_mask': 0,
+        'forces_code': 0,
+        'distribution_config': {'customization': None, 'market_concentration': None},
+        'selected_channel': None,
+        'target_audience': None,
+        'activity_mask': 0,
+        'cards_page': 0,
+        'scenarios': []
     }
-}
 
-# Data definitions (from original)
-PRODUCT_TYPES = {
-    'fmcg': {'name': 'FMCG/Consumer Goods', 'desc': 'Fast-moving consumer products'},
-    'luxury': {'name': 'Luxury Products', 'desc': 'Premium, high-differentiation items'},
-    'electronics': {'name': 'Electronics/Gadgets', 'desc': 'Technology products'},
-    'service': {'name': 'Service', 'desc': 'Intangible offerings'}
-}
+if 'step' not in st.session_state:
+    st.session_state.update({**session_defaults(), **(decode_plan(st.query_params.get('plan')) or {})})
+
+# Helper functions
+def sync_query_params():
+    # Keep the URL in step with the plan so any replica can resume it
+    token = encode_plan(st.session_state)
+    if st.query_params.get('plan') != token:
+        st.query_params['plan'] = token
 
-PRODUCT_STAGES = ['Introduction', 'Growth', 'Maturity', 'Decline']
+def selected_segments():
+    return SEGMENTS.members(st.session_state.segment_mask)
 
-MARKET_TYPES = {
-    'new-new': {'name': 'New Market + New Product', 'strategy': 'Diversification'},
-    'new-existing': {'name': 'New Market + Existing Product', 'strategy': 'Market Development'},
-    'existing-new': {'name': 'Existing Market + New Product', 'strategy': 'Product Development'},
-    'existing-existing': {'name': 'Existing Market + Existing Product', 'strategy': 'Market Penetration'}
-}
+def competitive_forces():
+    return FORCES.to_dict(st.session_state.forces_code)
 
-SEGMENTATION_OPTIONS = {
-    'user-status': {'name': 'User Status', 'desc': 'Non-users, potential users, regular users'},
-    'usage-rate': {'name': 'Usage Rate', 'desc': 'Light, medium, heavy users'},
-    'loyalty': {'name': 'Loyalty', 'desc': 'Brand loyal, switchers, competitors'},
-    'attitude': {'name': 'Attitude', 'desc': 'Enthusiastic, positive, negative'},
-    'demographic': {'name': 'Demographic', 'desc': 'Age, income, education, family size'},
-    'psychographic': {'name': 'Psychographic', 'desc': 'Lifestyle, values, personality'}
-}
+def selected_activities():
+    return ACTIVITIES.members(st.session_state.activity_mask)
 
-DISTRIBUTION_CHANNELS = {
-    'high-concentrated': {
-        'name': 'Direct Distribution',
-        'model': 'VMS (Vertical Marketing System)',
-        'description': 'Direct sales to concentrated customer base',
-        'pros': ['Perfect control over placement and quality', 'Enhanced consumer satisfaction', 'Less response time to grievances'],
-        'cons': ['Requires huge investments', 'May not be viable for low-margin products', 'Potential loss of flexibility'],
-        'examples': ['Company-owned stores', 'Direct sales force', 'E-commerce platform', 'B2B direct sales']
-    },
-    'high-fragmented': {
-        'name': 'Franchise Operations',
-        'model': 'Hybrid VMS',
-        'description': 'Standardized operations through franchise network',
-        'pros': ['Rapid market expansion', 'Controlled brand experience', 'Shared investment with franchisees', 'Local market expertise'],
-        'cons': ['Franchisee management complexity', 'Quality control challenges', 'Profit sharing with franchisees'],
-        'examples': ['Fast food franchises', 'Retail chain franchises', 'Service franchises', 'Master franchise model']
-    },
-    'low-concentrated': {
-        'name': 'Distribution + Personal Selling',
-        'model': 'Hybrid Traditional',
-        'description': 'Selected distributors with sales force support',
-        'pros': ['Market access without heavy investment', 'Sales force ensures customer relationships', 'Flexibility in market coverage'],
-        'cons': ['Moderate control over distribution', 'Coordination complexity', 'Channel conflict potential'],
-        'examples': ['Industrial distributors', 'B2B dealers with sales support', 'Authorized dealers', 'Value-added resellers']
-    },
-    'low-fragmented': {
-        'name': 'Third-Party Intensive Distribution',
-        'model': 'Traditional Channel',
-        'description': 'Maximum market coverage through multiple retailers',
-        'pros': ['Better market access by appointing more retailers', 'Low investment in distribution', 'Wide availability'],
-        'cons': ['Focus on volume, not customer satisfaction', 'Slow information flow', 'Manufacturer has minimal or no control', 'Frequent conflicts among channel members'],
-        'examples': ['Mass retailers', 'Supermarkets', 'Online marketplaces', 'Wholesaler networks', 'Multi-brand outlets']
-    }
-}
+def is_activity_selected(tool):
+    return ACTIVITIES.contains(st.session_state.activity_mask, tool)
 
-# Helper functions
 def get_distribution_recommendation():
-    config = st.session_state.distribution_config
-    if not config['customization'] or not config['market_concentration']:
-        return None
-    key = f"{config['customization']}-{config['market_concentration']}"
-    return DISTRIBUTION_CHANNELS.get(key)
+    return engine.get_distribution_recommendation(st.session_state.distribution_config)
 
 def get_recommendations():
-    recommendations = {
-        'strategy': '',
-        'pricing': '',
-        'promotion': '',
-        'distribution': '',
-        'messaging': []
-    }
-    
-    if st.session_state.market_type:
-        recommendations['strategy'] = MARKET_TYPES[st.session_state.market_type]['strategy']
-    
-    stage = st.session_state.product_stage
-    if stage == 'Introduction':
-        recommendations['promotion'] = 'Focus on Information & Advertising to build awareness. Use promotion to induce trial. Less sales promotion, more advertising investment.'
-        recommendations['pricing'] = 'Penetration pricing (low to gain market share) or Skimming pricing (high for innovative products)'
-    elif stage == 'Growth':
-        recommendations['promotion'] = 'Increase advertising to build preference. Sales promotions to attract new consumers and increase consumption.'
-        recommendations['pricing'] = 'Maintain or slightly reduce prices to match competition and maximize market share'
-    elif stage == 'Maturity':
-        recommendations['promotion'] = 'Effort to induce different usages. More sales promotion, less advertising. Focus on attracting marginal customers and brand switching.'
-        recommendations['pricing'] = 'Competitive pricing, promotional pricing to defend market share'
-    elif stage == 'Decline':
-        recommendations['promotion'] = 'Frequent sales promotions to liquidate stock. Extremely low advertising spend. Minimal promotional investment.'
-        recommendations['pricing'] = 'Discount pricing to clear inventory, harvest profits'
-    
-    dist_rec = get_distribution_recommendation()
-    if dist_rec:
-        recommendations['distribution'] = f"{dist_rec['name']} - {dist_rec['description']}"
-    else:
-        recommendations['distribution'] = 'Complete distribution configuration to get recommendation'
-    
-    forces = st.session_state.competitive_forces
-    if forces.get('rivalry') == 'High':
-        recommendations['messaging'].append('Differentiate strongly - high rivalry requires clear positioning')
-    if forces.get('buyers') == 'High':
-        recommendations['messaging'].append('Focus on value proposition - buyers have strong bargaining power')
-    if forces.get('newEntrants') == 'High':
-        recommendations['messaging'].append('Build brand loyalty quickly - threat of new entrants is high')
-    if forces.get('substitutes') == 'High':
-        recommendations['messaging'].append('Emphasize unique benefits - substitutes pose a threat')
-    
-    product_type = st.session_state.product_type
-    if product_type == 'luxury':
-        recommendations['messaging'].append('Premium positioning, emotional branding, exclusivity messaging')
-    elif product_type == 'fmcg':
-        recommendations['messaging'].append('Mass market appeal, convenience, value for money')
-    elif product_type == 'electronics':
-        recommendations['messaging'].append('Innovation focus, feature benefits, early adopter targeting')
-    
-    if 'loyalty' in st.session_state.segmentation:
-        recommendations['messaging'].append('Implement loyalty programs and retention marketing')
-    if 'usage-rate' in st.session_state.segmentation:
-        recommendations['messaging'].append('Tailor messaging for heavy vs. light users differently')
-    if 'psychographic' in st.session_state.segmentation:
-        recommendations['messaging'].append('Create lifestyle-based campaigns aligned with values')
-    
-    return recommendations
-
-def get_promotion_recommendations():
-    recommendations = []
-    focus = st.session_state.target_audience
-    
-    if not focus:
-        return []
-    
-    focus_lower = focus.lower()
-    
-    for tool, details in COMMUNICATION_TOOLS.items():
-        score = 0
-        reasoning = ''
-        
-        if 'customer' in focus_lower or 'b2c' in focus_lower:
-            if details['customer'] == 'Largely':
-                score = 3
-                reasoning = 'Highly effective for customer-centric approach'
-            elif details['customer'] == 'Partly':
-                score = 1
-                reasoning = 'Moderately effective for customers'
-        elif 'partner' in focus_lower or 'b2b' in focus_lower:
-            if details['partner'] == 'Largely':
-                score = 3
-                reasoning = 'Highly effective for partner-centric approach'
-            elif details['partner'] == 'Partly':
-                score = 1
-                reasoning = 'Moderately effective for partners'
-        else:
-            partner_score = 3 if details['partner'] == 'Largely' else 1 if details['partner'] == 'Partly' else 0
-            customer_score = 3 if details['customer'] == 'Largely' else 1 if details['customer'] == 'Partly' else 0
-            score = max(partner_score, customer_score)
-            reasoning = 'Balanced approach for mixed audience'
-        
-        if score > 0:
-            recommendations.append({
-                'tool': tool,
-                'score': score,
-                'reasoning': reasoning,
-                **details
-            })
-    
-    recommendations.sort(key=lambda x: x['score'], reverse=True)
-    return recommendations[:12]
+    with metrics.timer('get_recommendations'):
+        return engine.get_recommendations(
+            st.session_state.product_type,
+            st.session_state.product_stage,
+            st.session_state.market_type,
+            selected_segments(),
+            competitive_forces(),
+            st.session_state.distribution_config
+        )
+
+def get_promotion_page():
+    with metrics.timer('get_promotion_recommendations'):
+        return engine.get_promotion_page(st.session_state.target_audience, st.session_state.cards_page)
 
 def get_stage_advice(stage):
-    advice = {
-        'Introduction': 'Focus on awareness building through mass media, sampling, and trade shows. Consider promotional pricing.',
-        'Growth': 'Expand distribution through trade incentives. Build brand loyalty with loyalty programs and CSR activities.',
-        'Maturity': 'Maintain market share through competitive pricing, loyalty programs, and sustained advertising.',
-        'Decline': 'Focus on cost efficiency. Use targeted promotions, liquidation sales, and focus on loyal customer base.'
-    }
-    return advice.get(stage, 'Consider your product lifecycle stage when allocating marketing budget.')
+    return engine.get_stage_advice(stage)
 
 def get_type_advice(product_type):
-    type_lower = product_type.lower() if product_type else ''
-    
-    if 'fmcg' in type_lower or 'consumer' in type_lower:
-        return 'Consumer goods benefit from mass media advertising, POP displays, sampling events, and loyalty programs.'
-    elif 'industrial' in type_lower or 'b2b' in type_lower:
-        return 'Industrial products require trade shows, facility tours, trade discounts, and direct relationship building.'
-    elif 'luxury' in type_lower or 'premium' in type_lower:
-        return 'Premium products benefit from selective advertising, experiential events, and exclusive partnerships.'
-    elif 'service' in type_lower:
-        return 'Services require demonstration through sampling, testimonials, community engagement, and relationship marketing.'
-    return 'Tailor your communication mix to your product characteristics and target market.'
+    return engine.get_type_advice(product_type)
 
 def generate_whatsapp_message():
     channel = get_distribution_recommendation()
@@ -401,13 +245,890 @@ I'm interested in learning more about implementation."""
     
     return f"https://wa.me/?text={urllib.parse.quote(message)}"
 
+# WhatsApp bookings are queued and written to SQLite in the background
+@st.cache_resource
+def lead_queue():
+    queue = leads.LeadQueue()
+    atexit.register(queue.close)
+    return queue
+
+def record_lead(source):
+    channel = get_distribution_recommendation()
+    ctx = get_script_run_ctx()
+    lead_queue().submit(leads.LeadEvent(
+        created_at=time.time(),
+        source=source,
+        session_id=ctx.session_id if ctx else None,
+        product_type=PRODUCT_TYPES[st.session_state.product_type]['name'] if st.session_state.product_type else None,
+        product_stage=st.session_state.product_stage,
+        recommended_channel=channel['name'] if channel else None,
+        channel_model=channel['model'] if channel else None,
+        selected_channel=st.session_state.selected_channel
+    ))
+
+def can_proceed():
+    step = st.session_state.step
+    if step == 1:
+        return bool(st.session_state.product_type and st.session_state.product_stage)
+    elif step == 2:
+        return bool(st.session_state.market_type)
+    elif step == 3:
+        return st.session_state.segment_mask != 0
+    elif step == 4:
+        return FORCES.is_complete(st.session_state.forces_code)
+    elif step == 5:
+        return bool(st.session_state.distribution_config['customization'] and st.session_state.distribution_config['market_concentration'])
+    return False
+
+def fragment_run(render):
+    # A fragment's own rerun skips the top-level rerun count and profiling;
+    # inside a full run the body is already part of them
+    @functools.wraps(render)
+    def run(*args):
+        run_ctx = get_script_run_ctx()
+        if not (run_ctx and run_ctx.fragment_ids_this_run):
+            return render(*args)
+        metrics.REGISTRY.record_rerun(run_ctx.session_id)
+        with profiled_run(render.__name__):
+            return render(*args)
+    return run
+
+def wizard_fragment(render):
+    # Clicks inside a fragment only rerun that fragment. The navigation bar
+    # lives outside it, so fall back to a full rerun only when the click
+    # flips whether the current step is complete.
+    @st.fragment
+    @fragment_run
+    @functools.wraps(render)
+    def fragment(*args):
+        ready = can_proceed()
+        with metrics.timer(render.__name__):
+            render(*args)
+        sync_query_params()
+        if can_proceed() != ready:
+            st.rerun()
+    return fragment
+
+# Wizard steps
+@wizard_fragment
+def render_product_step():
+    st.header("Step 1: Product Information")
+    st.markdown("Select your product type and lifecycle stage")
+    
+    st.subheader("Product Type")
+    cols = st.columns(2)
+    for i, (key, value) in enumerate(PRODUCT_TYPES.items()):
+        with cols[i % 2]:
+            if st.button(f"**{value['name']}**\n\n{value['desc']}", key=f"prod_{key}", width='stretch'):
+                st.session_state.product_type = key
+    
+    if st.session_state.product_type:
+        st.success(f"✓ Selected: {PRODUCT_TYPES[st.session_state.product_type]['name']}")
+    
+    st.subheader("Product Lifecycle Stage")
+    cols = st.columns(4)
+    for i, stage in enumerate(PRODUCT_STAGES):
+        with cols[i]:
+            if st.button(stage, key=f"stage_{stage}", width='stretch'):
+                st.session_state.product_stage = stage
+    
+    if st.session_state.product_stage:
+        st.success(f"✓ Selected: {st.session_state.product_stage}")
+
+@wizard_fragment
+def render_market_step():
+    st.header("Step 2: Market Strategy (Ansoff Matrix)")
+    st.markdown("Choose your market-product combination")
+    
+    cols = st.columns(2)
+    for i, (key, value) in enumerate(MARKET_TYPES.items()):
+        with cols[i % 2]:
+            if st.button(f"**{value['name']}**\n\nStrategy: {value['strategy']}", key=f"market_{key}", width='stretch'):
+                st.session_state.market_type = key
+    
+    if st.session_state.market_type:
+        st.success(f"✓ Selected: {MARKET_TYPES[st.session_state.market_type]['strategy']}")
+
+@wizard_fragment
+def render_segmentation_step():
+    st.header("Step 3: Customer Segmentation")
+    st.markdown("Select relevant segmentation criteria for targeting")
+    
+    for key, value in SEGMENTATION_OPTIONS.items():
+        checked = st.checkbox(
+            f"**{value['name']}** - {value['desc']}", 
+            value=SEGMENTS.contains(st.session_state.segment_mask, key), 
+            key=f"seg_{key}"
+        )
+        st.session_state.segment_mask = SEGMENTS.assign(st.session_state.segment_mask, key, checked)
+    
+    if st.session_state.segment_mask:
+        st.success(f"✓ Selected {SEGMENTS.count(st.session_state.segment_mask)} segmentation criteria")
+
+@wizard_fragment
+def render_force_row(key, label):
+    st.subheader(label)
+    cols = st.columns(3)
+    for i, option in enumerate(FORCE_LEVELS):
+        with cols[i]:
+            if st.button(option, key=f"force_{key}_{option}", width='stretch'):
+                st.session_state.forces_code = FORCES.set(st.session_state.forces_code, key, option)
+    
+    level = FORCES.get(st.session_state.forces_code, key)
+    if level:
+        st.success(f"✓ Selected: {level}")
+
+def render_forces_step():
+    st.header("Step 4: Porter's 5 Forces Analysis")
+    st.markdown("Assess competitive forces in your market")
+    
+    for key, label in COMPETITIVE_FORCES:
+        render_force_row(key, label)
+
+@wizard_fragment
+def render_distribution_step():
+    st.header("Step 5: Distribution Channel Strategy")
+    st.markdown("Configure your distribution approach")
+    
+    st.info("**Distribution Channel Selection Framework**\n\nChoose based on product customization level and target market concentration")
+    
+    st.subheader("Product Customization Level")
+    cols = st.columns(2)
+    with cols[0]:
+        if st.button("**High Customization**\n\nTailored products, bespoke services", key="cust_high", width='stretch'):
+            st.session_state.distribution_config['customization'] = 'high'
+    with cols[1]:
+        if st.button("**Low Customization**\n\nStandardized products, mass market", key="cust_low", width='stretch'):
+            st.session_state.distribution_config['customization'] = 'low'
+    
+    if st.session_state.distribution_config['customization']:
+        st.success(f"✓ Selected: {st.session_state.distribution_config['customization'].title()} Customization")
+    
+    st.subheader("Target Market Concentration")
+    cols = st.columns(2)
+    with cols[0]:
+        if st.button("**Concentrated Market**\n\nFew large customers, B2B, niche segments", key="market_conc", width='stretch'):
+            st.session_state.distribution_config['market_concentration'] = 'concentrated'
+    with cols[1]:
+        if st.button("**Fragmented Market**\n\nMany small customers, B2C, mass market", key="market_frag", width='stretch'):
+            st.session_state.distribution_config['market_concentration'] = 'fragmented'
+    
+    if st.session_state.distribution_config['market_concentration']:
+        st.success(f"✓ Selected: {st.session_state.distribution_config['market_concentration'].title()} Market")
+    
+    # Show recommendation
+    channel = get_distribution_recommendation()
+    if channel:
+        st.markdown("---")
+        st.success("### 🎯 Recommended Distribution Channel")
+        st.markdown(f"## {channel['name']}")
+        st.markdown(f"**Model:** {channel['model']}")
+        st.markdown(channel['description'])
+        
+        cols = st.columns(2)
+        with cols[0]:
+            st.markdown("**✓ Pros:**")
+            for pro in channel['pros']:
+                st.markdown(f"- {pro}")
+        with cols[1]:
+            st.markdown("**⚠ Cons:**")
+            for con in channel['cons']:
+                st.markdown(f"- {con}")
+        
+        st.subheader("Select Specific Channel Type")
+        st.session_state.selected_channel = st.selectbox(
+            "Choose a channel option:",
+            [''] + list(channel['examples']),
+            index=0 if not st.session_state.selected_channel else 
+                  channel['examples'].index(st.session_state.selected_channel) + 1 
+                  if st.session_state.selected_channel in channel['examples'] else 0
+        )
+        
+        if st.session_state.selected_channel:
+            if st.button("📱 Book Channel Setup via WhatsApp", width='stretch', type="primary"):
+                record_lead('channel_setup')
+                whatsapp_url = generate_whatsapp_message()
+                st.markdown(f"[Click here to open WhatsApp]({whatsapp_url})")
+
+def render_force_sensitivity():
+    cols = st.columns(2)
+    with cols[0]:
+        vary_stage = st.checkbox("Compare all lifecycle stages", key='sensitivity_stages')
+    with cols[1]:
+        vary_type = st.checkbox("Compare all product types", key='sensitivity_types')
+    with metrics.timer('force_sensitivity'):
+        result = sensitivity.explore(
+            st.session_state.product_type, st.session_state.product_stage, st.session_state.market_type,
+            selected_segments(), competitive_forces(), st.session_state.distribution_config,
+            vary_stage=vary_stage, vary_type=vary_type
+        )
+    st.markdown(f"Across all {len(sensitivity.grid())} force combinations, **{result.changed_share:.0%}** "
+                f"change your recommendations ({result.distinct_outcomes} distinct outcomes).")
+
+    # One force changed at a time
+    changes = {(change.force, change.level): change for change in result.single_changes}
+    current = competitive_forces()
+    rows = []
+    for key, label in COMPETITIVE_FORCES:
+        row = {'Force': label}
+        for level in FORCE_LEVELS:
+            change = changes.get((key, level))
+            if current.get(key) == level:
+                row[level] = "● current"
+            elif change.changed:
+                row[level] = "⚠️ " + ", ".join(change.changed)
+            else:
+                row[level] = "no change"
+        rows.append(row)
+    st.dataframe(rows, hide_index=True, width='stretch')
+
+    flips = [change for change in result.single_changes if change.changed]
+    labels = dict(COMPETITIVE_FORCES)
+    for change in flips:
+        details = [f"+ {msg}" for msg in change.added] + [f"− {msg}" for msg in change.removed]
+        st.markdown(f"**{labels[change.force]} → {change.level}:** " + "; ".join(details or change.changed))
+    if not flips:
+        st.caption("No single force change alters these recommendations.")
+
+    if result.cells:
+        st.markdown("**Share of force combinations that change the recommendations, by stage and product type**")
+        stages = sorted({stage for stage, _ in result.cells}, key=lambda s: PRODUCT_STAGES.index(s) if s in PRODUCT_STAGES else -1)
+        types = list(dict.fromkeys(product_type for _, product_type in result.cells))
+        st.dataframe(
+            [{'Stage': stage or 'N/A',
+              **{PRODUCT_TYPES[t]['name'] if t in PRODUCT_TYPES else 'N/A': f"{result.cells[stage, t][0]:.0%}" for t in types}}
+             for stage in stages],
+            hide_index=True, width='stretch'
+        )
+
+# Scenario comparison
+@st.cache_resource
+def scenario_evaluator():
+    evaluator = scenarios.ScenarioEvaluator()
+    atexit.register(evaluator.shutdown)
+    return evaluator
+
+SCENARIO_OUTPUT_LABELS = {
+    'strategy': 'Core Strategy',
+    'pricing': 'Pricing',
+    'promotion': 'Promotion',
+    'distribution': 'Distribution',
+    'messaging': 'Messaging',
+    'channel': 'Channel',
+    'promotion_mix': 'Top Activities'
+}
+
+def current_scenario(name):
+    config = st.session_state.distribution_config
+    return scenarios.Scenario(
+        name, st.session_state.product_type, st.session_state.product_stage, st.session_state.market_type,
+        tuple(selected_segments()), tuple(competitive_forces().items()),
+        config['customization'], config['market_concentration'], st.session_state.target_audience
+    )
+
+def add_scenario(scenario=None):
+    names = {existing.name for existing in st.session_state.scenarios}
+    number = len(st.session_state.scenarios) + 1
+    while f"Scenario {number}" in names:
+        number += 1
+    scenario = (scenario or current_scenario(''))._replace(name=f"Scenario {number}")
+    st.session_state.scenarios = [*st.session_state.scenarios, scenario]
+    st.session_state.scenario_edit = len(st.session_state.scenarios) - 1
+
+def remove_scenario(index):
+    st.session_state.scenarios = [s for i, s in enumerate(st.session_state.scenarios) if i != index]
+    st.session_state.scenario_edit = max(0, min(index, len(st.session_state.scenarios) - 1))
+
+def scenario_choice(label, options, value, format_func=str):
+    options = [None, *options]
+    return st.selectbox(label, options, index=options.index(value) if value in options else 0,
+                        format_func=lambda option: '—' if option is None else format_func(option))
+
+def render_scenario_editor(index):
+    scenario = st.session_state.scenarios[index]
+    forces = dict(scenario.competitive_forces)
+    # Widgets are unkeyed so they pick up the scenario's values whenever it changes
+    with st.form(f"scenario_form_{index}"):
+        name = st.text_input("Name", scenario.name)
+        cols = st.columns(3)
+        with cols[0]:
+            product_type = scenario_choice("Product Type", PRODUCT_TYPES, scenario.product_type,
+                                           lambda key: PRODUCT_TYPES[key]['name'])
+            product_stage = scenario_choice("Product Stage", PRODUCT_STAGES, scenario.product_stage)
+            market_type = scenario_choice("Market", MARKET_TYPES, scenario.market_type,
+                                          lambda key: MARKET_TYPES[key]['name'])
+        with cols[1]:
+            customization = scenario_choice("Customization", ('high', 'low'), scenario.customization, str.title)
+            concentration = scenario_choice("Market Concentration", ('concentrated', 'fragmented'),
+                                            scenario.market_concentration, str.title)
+            target_audience = scenario_choice("Target Audience", AUDIENCE_OPTIONS, scenario.target_audience)
+        with cols[2]:
+            segmentation = st.multiselect("Segments", list(SEGMENTATION_OPTIONS),
+                                          [key for key in scenario.segmentation if key in SEGMENTATION_OPTIONS],
+                                          format_func=lambda key: SEGMENTATION_OPTIONS[key]['name'])
+        cols = st.columns(len(COMPETITIVE_FORCES))
+        ratings = {}
+        for col, (key, label) in zip(cols, COMPETITIVE_FORCES):
+            with col:
+                ratings[key] = scenario_choice(label, FORCE_LEVELS, forces.get(key))
+        if st.form_submit_button("Apply Changes", width='stretch'):
+            st.session_state.scenarios = [
+                scenarios.Scenario(
+                    name.strip() or scenario.name, product_type, product_stage, market_type, tuple(segmentation),
+                    tuple((key, level) for key, level in ratings.items() if level), customization, concentration,
+                    target_audience
+                ) if i == index else existing
+                for i, existing in enumerate(st.session_state.scenarios)
+            ]
+
+def scenario_inputs(scenario):
+    return {
+        'Product Type': PRODUCT_TYPES[scenario.product_type]['name'] if scenario.product_type in PRODUCT_TYPES else '—',
+        'Product Stage': scenario.product_stage or '—',
+        'Market': MARKET_TYPES[scenario.market_type]['name'] if scenario.market_type in MARKET_TYPES else '—',
+        'Segments': ", ".join(SEGMENTATION_OPTIONS[key]['name'] for key in scenario.segmentation
+                              if key in SEGMENTATION_OPTIONS) or '—',
+        'Forces': ", ".join(f"{dict(COMPETITIVE_FORCES)[key]}: {level}" for key, level in scenario.competitive_forces) or '—',
+        'Distribution': f"{(scenario.customization or '—').title()} / {(scenario.market_concentration or '—').title()}",
+        'Target Audience': scenario.target_audience or '—'
+    }
+
+def format_output(value):
+    if isinstance(value, tuple):
+        return "; ".join(value) or '—'
+    return value or '—'
+
+@st.fragment
+def render_scenario_comparison():
+    scenario_list = st.session_state.scenarios
+    cols = st.columns([1, 2, 1, 1])
+    with cols[0]:
+        st.button("➕ Add Current Plan", key='scenario_add', width='stretch', on_click=add_scenario,
+                  disabled=len(scenario_list) >= scenarios.MAX_SCENARIOS)
+    if not scenario_list:
+        st.caption("Add the current plan, then add or edit copies of it to compare variants side by side.")
+        return
+    with cols[1]:
+        index = st.selectbox("Edit scenario", range(len(scenario_list)), key='scenario_edit',
+                             format_func=lambda i: f"{i + 1}. {scenario_list[i].name}", label_visibility='collapsed')
+    with cols[2]:
+        st.button("📄 Duplicate", key='scenario_duplicate', width='stretch', on_click=add_scenario,
+                  args=(scenario_list[index],), disabled=len(scenario_list) >= scenarios.MAX_SCENARIOS)
+    with cols[3]:
+        st.button("🗑️ Remove", key='scenario_remove', width='stretch', on_click=remove_scenario,
+                  args=(index,))
+    render_scenario_editor(index)
+
+    scenario_list = st.session_state.scenarios
+    with metrics.timer('scenario_comparison'):
+        results, computed = scenario_evaluator().evaluate_all(scenario_list)
+    headers = [f"{i}. {scenario.name}" for i, scenario in enumerate(scenario_list, 1)]
+    only_differences = st.checkbox("Only show outputs that differ", value=True, key='scenario_only_differences')
+
+    inputs = [scenario_inputs(scenario) for scenario in scenario_list]
+    rows = [{'': field, **{header: values[field] for header, values in zip(headers, inputs)}} for field in inputs[0]]
+    diffs = scenarios.diff(results)
+    shown = [d for d in diffs if d.differs or not only_differences]
+    rows += [
+        {'': f"≠ {SCENARIO_OUTPUT_LABELS[d.output]}" if d.differs else SCENARIO_OUTPUT_LABELS[d.output],
+         **{header: format_output(value) for header, value in zip(headers, d.values)}}
+        for d in shown
+    ]
+    st.dataframe(rows, hide_index=True, width='stretch')
+    if not any(d.differs for d in diffs):
+        st.caption("All scenarios lead to the same recommendations.")
+
+    # List outputs, item by item against the first scenario
+    for d in diffs:
+        if not d.differs or not d.added:
+            continue
+        for header, added, removed in list(zip(headers, d.added, d.removed))[1:]:
+            details = [f"+ {item}" for item in added] + [f"− {item}" for item in removed]
+            if details:
+                st.markdown(f"**{SCENARIO_OUTPUT_LABELS[d.output]}, {header} vs 1:** " + "; ".join(details))
+    st.caption(f"Computed {computed} of {len(scenario_list)} scenarios on this run; the rest came from the cache.")
+
+@wizard_fragment
+def render_results_step():
+    st.header("Complete Marketing Recommendations")
+    st.markdown("Strategic recommendations based on your inputs")
+    
+    recommendations = get_recommendations()
+    
+    st.success(f"### 🎯 Core Strategy: {recommendations.strategy}")
+    
+    cols = st.columns(2)
+    with cols[0]:
+        st.info("### 📈 Promotion Strategy")
+        st.markdown(recommendations.promotion)
+    with cols[1]:
+        st.info("### 💰 Pricing Strategy")
+        st.markdown(recommendations.pricing)
+    
+    st.info("### 📦 Distribution Strategy")
+    st.markdown(recommendations.distribution)
+    
+    if st.session_state.selected_channel:
+        st.markdown(f"**Selected Channel:** {st.session_state.selected_channel}")
+        if st.button("📱 Contact via WhatsApp", key="whatsapp_final"):
+            record_lead('final_contact')
+            whatsapp_url = generate_whatsapp_message()
+            st.markdown(f"[Click here to open WhatsApp]({whatsapp_url})")
+    
+    st.warning("### 💡 Key Messaging Insights")
+    for msg in recommendations.messaging:
+        st.markdown(f"- {msg}")
+    
+    # Lazy: only computed while the panel is open
+    sensitivity_panel = st.expander("🔬 Force Sensitivity", key='sensitivity_open', on_change='rerun')
+    if sensitivity_panel.open:
+        with sensitivity_panel:
+            render_force_sensitivity()
+    
+    compare_panel = st.expander("⚖️ Compare Scenarios", key='compare_open', on_change='rerun')
+    if compare_panel.open:
+        with compare_panel:
+            render_scenario_comparison()
+    
+    st.caption("*Note: These recommendations are based on established marketing frameworks including Consumer Behavior Model (Engel, Blackwell, Miniard & Harcourt 2001), Porter's 5 Forces, Ansoff Matrix, Product Lifecycle, and Distribution Channel Strategy.*")
+    
+    if st.button("💾 Save to History", key="save_results", width='stretch'):
+        st.toast("Plan saved to history" if save_plan() else "This plan is already saved")
+    
+    # Link to Promotion Mix
+    st.markdown("---")
+    st.info("### 🎨 Ready to create your promotion materials?")
+    if st.button("Go to Promotion Mix Tool →", type="primary", width='stretch'):
+        st.session_state.app_mode = "Promotion Mix"
+        st.rerun()
+
+STEP_RENDERERS = {
+    1: render_product_step,
+    2: render_market_step,
+    3: render_segmentation_step,
+    4: render_forces_step,
+    5: render_distribution_step,
+    6: render_results_step
+}
+
+# Promotion Mix activity cards
+def activity_fragment_key(tool):
+    return f"activity_{tool}"
+
+def toggle_activity(tool):
+    st.session_state.activity_mask = ACTIVITIES.toggle(st.session_state.activity_mask, tool)
+    st.session_state.pop('pdf_report', None)
+    cancel_simulation()
+    sync_query_params()
+    # Redraw only the clicked card and the selection readouts
+    st.rerun([activity_fragment_key(tool), 'selection_count', 'selection_summary'])
+
+@fragment_run
+def render_activity_card(rec):
+    # Lazy: the body, with its resource links and link checks, only renders while the card is open
+    # The label stays fixed: a new label is a new widget, which would collapse the card on every toggle
+    if is_activity_selected(rec['tool']):
+        st.caption("✓ In your promotion mix")
+    card = st.expander(f"**{rec['tool']}** - {rec['reasoning']}", key=f"card_{rec['tool']}", on_change='rerun')
+    if not card.open:
+        return
+    with card:
+        cols = st.columns([3, 1])
+        with cols[0]:
+            st.markdown(f"**Type:** {rec['type'].replace('-', ' ').title()}")
+            st.markdown(f"**Partner Focus:** {rec['partner'] or 'N/A'}")
+            st.markdown(f"**Customer Focus:** {rec['customer'] or 'N/A'}")
+        with cols[1]:
+            priority_class = "priority-high" if rec['score'] == 3 else "priority-medium"
+            priority_text = "High Priority" if rec['score'] == 3 else "Medium Priority"
+            st.markdown(f'<span class="{priority_class}">{priority_text}</span>', unsafe_allow_html=True)
+        
+        # Toggle selection
+        if is_activity_selected(rec['tool']):
+            st.button(f"Remove from Mix", key=f"remove_{rec['tool']}", width='stretch',
+                      on_click=toggle_activity, args=(rec['tool'],))
+        else:
+            st.button(f"Add to Mix", key=f"add_{rec['tool']}", type="primary", width='stretch',
+                      on_click=toggle_activity, args=(rec['tool'],))
+        
+        # Design resources
+        if rec['resources']:
+            st.markdown("---")
+            st.markdown("**🎨 Design Resources:**")
+            with metrics.timer('resource_links'):
+                # Reads cached results only; stale links are rechecked in the background
+                monitor = link_monitor()
+                if monitor:
+                    monitor.refresh([resource['url'] for resource in rec['resources']])
+                for resource in rec['resources']:
+                    health = monitor.status(resource['url']) if monitor else None
+                    cols = st.columns([1, 4, 1])
+                    with cols[0]:
+                        st.markdown(f"{resource['icon']}")
+                    with cols[1]:
+                        st.markdown(f"**{resource['name']}** - {resource['desc']}")
+                        if health and health.status != 'ok':
+                            st.caption(f"⚠️ Link may be broken ({health.code or 'unreachable'})")
+                    with cols[2]:
+                        st.link_button("Open", resource['url'], width='stretch')
+
+# Design resource link checks, shared by all sessions; MARKETING_LINK_CHECK=0 disables them
+@st.cache_resource
+def link_monitor():
+    if os.environ.get('MARKETING_LINK_CHECK', '1') == '0':
+        return None
+    return link_health.LinkMonitor()
+
+# PDF export
+@st.cache_resource
+def pdf_exporter():
+    cache = pdf_export.ReportCache(
+        os.environ.get('MARKETING_REPORT_CACHE', pdf_export.DEFAULT_CACHE_DIR),
+        int(os.environ.get('MARKETING_REPORT_CACHE_MB', 64)) * 1024 * 1024
+    )
+    return pdf_export.ReportExporter(cache)
+
+def report_plan():
+    recommendations = get_recommendations()
+    return {
+        'product_type': PRODUCT_TYPES[st.session_state.product_type]['name'] if st.session_state.product_type else '',
+        'product_stage': st.session_state.product_stage or '',
+        'target_audience': st.session_state.target_audience or '',
+        'selected_channel': st.session_state.selected_channel or '',
+        'recommendations': {**recommendations._asdict(), 'messaging': list(recommendations.messaging)},
+        'activities': [
+            {'tool': tool, 'type': COMMUNICATION_TOOLS[tool]['type'], 'resources': thaw(COMMUNICATION_TOOLS[tool]['resources'])}
+            for tool in selected_activities()
+        ]
+    }
+
+# Plan history
+@st.cache_resource
+def plan_store():
+    return history.PlanStore()
+
+def save_plan():
+    """Save the current plan unless this exact plan was already saved by this session."""
+    token = encode_plan(st.session_state)
+    if st.session_state.get('saved_plan') == token:
+        return False
+    ctx = get_script_run_ctx()
+    plan_store().save(token, {
+        'product_type': st.session_state.product_type,
+        'product_stage': st.session_state.product_stage,
+        'market_type': st.session_state.market_type,
+        'selected_channel': st.session_state.selected_channel,
+        'strategy': get_recommendations().strategy,
+        'activities': selected_activities(),
+        'channel': engine.distribution_key(st.session_state.distribution_config),
+        'forces': competitive_forces()
+    }, session_id=ctx.session_id if ctx else None)
+    st.session_state.saved_plan = token
+    return True
+
+@st.fragment
+def render_plan_history():
+    cols = st.columns(4)
+    with cols[0]:
+        product_type = st.selectbox("Product", [None] + list(PRODUCT_TYPES), key='history_product_type',
+                                    format_func=lambda key: PRODUCT_TYPES[key]['name'] if key else 'All')
+    with cols[1]:
+        product_stage = st.selectbox("Stage", [None] + PRODUCT_STAGES, key='history_product_stage',
+                                     format_func=lambda stage: stage or 'All')
+    with cols[2]:
+        market_type = st.selectbox("Market", [None] + list(MARKET_TYPES), key='history_market_type',
+                                   format_func=lambda key: MARKET_TYPES[key]['name'] if key else 'All')
+    with cols[3]:
+        selected_channel = st.selectbox("Channel", [None] + plan_store().distinct('selected_channel'),
+                                        key='history_channel', format_func=lambda channel: channel or 'All')
+    filters = {'product_type': product_type, 'product_stage': product_stage,
+               'market_type': market_type, 'selected_channel': selected_channel}
+
+    # Keyset pagination: a stack of 'before' cursors, reset when the filters change
+    if st.session_state.get('history_filters') != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+    rows, next_cursor = plan_store().page(filters, before=cursors[-1])
+
+    if not rows:
+        st.caption("No saved plans yet. Save a plan from the results or your promotion mix.")
+        return
+    st.dataframe(
+        [{
+            'Saved': datetime.datetime.fromtimestamp(row['created_at']).strftime('%Y-%m-%d %H:%M'),
+            'Product': PRODUCT_TYPES[row['product_type']]['name'] if row['product_type'] in PRODUCT_TYPES else row['product_type'],
+            'Stage': row['product_stage'],
+            'Market': MARKET_TYPES[row['market_type']]['name'] if row['market_type'] in MARKET_TYPES else row['market_type'],
+            'Channel': row['selected_channel'],
+            'Strategy': row['strategy'],
+            'Activities': len(row['activities']),
+            'Open': f"?plan={row['token']}"
+        } for row in rows],
+        column_config={'Open': st.column_config.LinkColumn("Open", display_text="Open plan")},
+        hide_index=True, width='stretch'
+    )
+    cols = st.columns(2)
+    with cols[0]:
+        st.button("← Newer", key='history_newer', disabled=len(cursors) == 1, width='stretch',
+                  on_click=cursors.pop)
+    with cols[1]:
+        st.button("Older →", key='history_older', disabled=next_cursor is None, width='stretch',
+                  on_click=cursors.append, args=(next_cursor,))
+
+def count_chart(counts, names, label, limit=None):
+    rows = sorted(counts.items(), key=lambda item: -item[1])[:limit]
+    if not rows:
+        st.caption("None recorded yet.")
+        return
+    st.bar_chart([{label: names(key), 'Plans': count} for key, count in rows], x=label, y='Plans', horizontal=True)
+
+@st.fragment
+def render_plan_analytics():
+    cols = st.columns(2)
+    with cols[0]:
+        product_type = st.selectbox("Product", [None] + list(PRODUCT_TYPES), key='analytics_product_type',
+                                    format_func=lambda key: PRODUCT_TYPES[key]['name'] if key else 'All')
+    with cols[1]:
+        product_stage = st.selectbox("Stage", [None] + PRODUCT_STAGES, key='analytics_product_stage',
+                                     format_func=lambda stage: stage or 'All')
+
+    # Reads only the materialized counters, never the plans table
+    with metrics.timer('plan_analytics'):
+        stats = plan_store().stats(product_type, product_stage)
+    if not stats:
+        st.caption("No saved plans match.")
+        return
+    st.metric("Saved Plans", stats['plans'][''])
+
+    cols = st.columns(2)
+    with cols[0]:
+        st.markdown("**Ansoff Strategies**")
+        count_chart(stats.get('market_type', {}), lambda key: MARKET_TYPES[key]['strategy'] if key in MARKET_TYPES else key, 'Strategy')
+    with cols[1]:
+        st.markdown("**Distribution Channels**")
+        count_chart(stats.get('channel', {}), lambda key: DISTRIBUTION_CHANNELS[key]['name'] if key in DISTRIBUTION_CHANNELS else key, 'Channel')
+
+    st.markdown("**Top Promotion Tools**")
+    count_chart(stats.get('tool', {}), lambda tool: tool, 'Tool', limit=10)
+
+    st.markdown("**Competitive Force Profiles**")
+    st.dataframe(
+        [{'Force': label, **{level: stats.get(f'force:{key}', {}).get(level, 0) for level in FORCE_LEVELS}}
+         for key, label in COMPETITIVE_FORCES],
+        hide_index=True, width='stretch'
+    )
+
+def pdf_report_status():
+    exporter = pdf_exporter()
+    status = exporter.status(st.session_state.pdf_report)
+    if status[0] == 'missing':
+        # Evicted from the report cache since it was rendered: render it again
+        st.session_state.pdf_report = exporter.request(report_plan())
+        status = exporter.status(st.session_state.pdf_report)
+    return status
+
+def render_pdf_export():
+    # A full run hands over the status it already fetched; polling reruns fetch their own
+    status, result = st.session_state.pop('pdf_status', None) or pdf_report_status()
+    if status == 'pending':
+        st.session_state.pdf_polling = True
+        st.info("⏳ Generating your PDF report...")
+        return
+    if st.session_state.pop('pdf_polling', False):
+        # Finished while polling: rerun once so the poller is dropped
+        st.rerun()
+    if status == 'ready':
+        st.download_button("⬇️ Download PDF", result, file_name="promotion-mix-report.pdf",
+                           mime="application/pdf", width='stretch')
+    else:
+        st.error(f"PDF export failed: {result}")
+
+def change_cards_page(step):
+    st.session_state.cards_page += step
+
+def render_cards_pager(total):
+    pages = -(-total // engine.PROMOTION_PAGE_SIZE)
+    if pages <= 1:
+        return
+    page = st.session_state.cards_page
+    cols = st.columns([1, 2, 1])
+    with cols[0]:
+        st.button("← Previous", key='cards_previous', disabled=page == 0, width='stretch',
+                  on_click=change_cards_page, args=(-1,))
+    with cols[1]:
+        first = page * engine.PROMOTION_PAGE_SIZE + 1
+        st.caption(f"Showing {first}–{min(first + engine.PROMOTION_PAGE_SIZE - 1, total)} of {total} activities, "
+                   f"best match first")
+    with cols[2]:
+        st.button("Next page →", key='cards_next', disabled=page >= pages - 1, width='stretch',
+                  on_click=change_cards_page, args=(1,))
+
+@st.fragment(key='selection_count')
+def render_selection_count():
+    if st.session_state.activity_mask:
+        st.success(f"✓ {ACTIVITIES.count(st.session_state.activity_mask)} Selected")
+
+# Its own fragment: slider moves rerun only the allocation, not the rest of the summary
+@st.fragment
+def render_budget_allocation():
+    st.markdown("#### 💰 Budget Allocation")
+    total_budget = st.slider("Total Budget", min_value=1000, max_value=500000, value=50000, step=1000,
+                             key='budget_total')
+    with metrics.timer('budget_allocation'):
+        allocation = engine.allocate_budget(selected_activities(), total_budget,
+                                            st.session_state.get('promotion_stage'), st.session_state.target_audience)
+    st.dataframe(
+        [{
+            'Activity': tool,
+            'Spend': round(spend),
+            'Share': f"{spend / total_budget:.0%}",
+            'Expected Response': round(response, 1)
+        } for tool, spend, response in zip(allocation.tools, allocation.spend.tolist(), allocation.response.tolist())],
+        hide_index=True, width='stretch'
+    )
+    st.caption(f"Spend is split so each funded activity returns the same response per extra unit of budget "
+               f"({allocation.marginal_return * 1000:.2f} per 1,000). Activities at 0 return less than that even at their first unit.")
+
+# Monte Carlo outcome simulation; large runs go to a process pool and stream back
+SIMULATION_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+OUTCOME_LABELS = {
+    'reach': 'People Reached',
+    'conversions': 'Conversions',
+    'cost': 'Cost',
+    'cost_per_conversion': 'Cost per Conversion'
+}
+
+@st.cache_resource
+def simulator():
+    sim = simulation.Simulator()
+    atexit.register(sim.shutdown)
+    return sim
+
+def cancel_simulation():
+    # The simulator is shared by every session: stop a superseded run's queued
+    # chunks so they don't hold up other sessions' runs
+    run = st.session_state.pop('simulation', None)
+    if run is not None:
+        run['job'].cancel()
+
+def render_simulation_results():
+    run = st.session_state.simulation
+    job = run['job']
+    if job.error:
+        st.error(f"Simulation failed: {job.error}")
+        return
+    if not job.finished:
+        st.session_state.simulation_polling = True
+        st.progress(job.completed_draws / job.total_draws,
+                    text=f"Simulated {job.completed_draws:,} of {job.total_draws:,} draws...")
+    elif st.session_state.pop('simulation_polling', False):
+        # Finished while polling: rerun once so the poller is dropped
+        st.rerun()
+    with metrics.timer('simulation_summary'):
+        summary = job.summary()
+    if summary is None:
+        return
+    counts, edges = summary.histogram
+    st.caption(f"{summary.draws:,} draws for a budget of {run['budget']:,}")
+    st.dataframe(
+        [{'Outcome': OUTCOME_LABELS[name], **{key: round(value, 2) for key, value in stats.items()}}
+         for name, stats in summary.stats.items()],
+        hide_index=True, width='stretch'
+    )
+    st.bar_chart([{'Conversions': f"{edge:,.0f}", 'Draws': int(count)} for edge, count in zip(edges, counts)],
+                 x='Conversions', y='Draws')
+
+def render_simulation():
+    st.markdown("#### 🎲 Outcome Simulation")
+    cols = st.columns([3, 1])
+    with cols[0]:
+        draws = st.select_slider("Draws", SIMULATION_SIZES, value=100_000, format_func=lambda n: f"{n:,}",
+                                 key='simulation_draws')
+    with cols[1]:
+        if st.button("Run Simulation", width='stretch'):
+            model = engine.simulation_model(selected_activities(), st.session_state.budget_total,
+                                            st.session_state.get('promotion_stage'), st.session_state.target_audience)
+            cancel_simulation()
+            st.session_state.simulation = {'job': simulator().start(model, draws),
+                                           'budget': st.session_state.budget_total}
+    run = st.session_state.get('simulation')
+    if run is not None:
+        st.fragment(render_simulation_results, run_every=None if run['job'].finished else 0.5)()
+
+@st.fragment(key='selection_summary')
+def render_selection_summary():
+    if st.session_state.activity_mask:
+        st.markdown("---")
+        st.success("### 🎯 Your Selected Promotion Mix")
+        
+        cols = st.columns(3)
+        for i, activity in enumerate(selected_activities()):
+            with cols[i % 3]:
+                st.markdown(f"**{i+1}.** {activity}")
+        
+        render_budget_allocation()
+        render_simulation()
+        
+        st.markdown("---")
+        cols = st.columns(3)
+        with cols[0]:
+            if st.button("📄 Export as PDF", width='stretch'):
+                st.session_state.pdf_report = pdf_exporter().request(report_plan())
+            if st.session_state.get('pdf_report') and st.session_state.pdf_report != pdf_export.plan_key(report_plan()):
+                # Built for inputs that have changed since (audience, stage, market, channel, ...)
+                del st.session_state.pdf_report
+            if st.session_state.get('pdf_report'):
+                # Poll the background job only while it is still rendering
+                st.session_state.pdf_status = pdf_report_status()
+                pending = st.session_state.pdf_status[0] == 'pending'
+                st.fragment(render_pdf_export, run_every=1.0 if pending else None)()
+        with cols[1]:
+            if st.button("💾 Save to History", key="save_mix", width='stretch'):
+                st.toast("Plan saved to history" if save_plan() else "This plan is already saved")
+        with cols[2]:
+            if st.button("✉️ Share via Email", width='stretch'):
+                st.info("Email sharing functionality coming soon!")
+
+# Catalog search
+@st.fragment
+def render_catalog_search():
+    query = st.text_input("🔎 Search tools & design resources", key='catalog_query',
+                          placeholder="e.g., video, templates, social media")
+    if not query:
+        return
+    index = search.search_index()
+    with metrics.timer('catalog_search'):
+        results = index.search(query)
+        suggestions = index.suggest(query)
+    if suggestions:
+        st.caption("Suggestions: " + ", ".join(suggestions))
+    if not results:
+        st.info("No matching tools or resources.")
+        return
+    for result in results:
+        resource = result['resource']
+        cols = st.columns([1, 4, 1])
+        if resource is None:
+            with cols[0]:
+                st.markdown("🧰")
+            with cols[1]:
+                st.markdown(f"**{result['tool']}** - {result['type'].replace('-', ' ').title()}")
+        else:
+            with cols[0]:
+                st.markdown(f"{resource['icon']}")
+            with cols[1]:
+                st.markdown(f"**{resource['name']}** - {resource['desc']} *({result['tool']})*")
+            with cols[2]:
+                st.link_button("Open", resource['url'], width='stretch')
+
 # Sidebar navigation
-with st.sidebar:
+with metrics.timer('sidebar'), st.sidebar:
     st.title("📊 Navigation")
     st.session_state.app_mode = st.radio(
         "Select Tool:",
-        ["Marketing Strategy", "Promotion Mix"],
-        index=0 if st.session_state.app_mode == "Marketing Strategy" else 1
+        APP_MODES,
+        index=APP_MODES.index(st.session_state.app_mode)
     )
     
     st.markdown("---")
@@ -421,7 +1142,7 @@ with st.sidebar:
     """)
 
 # Main content
-if st.session_state.app_mode == "Marketing Strategy":
+def render_strategy_tool():
     st.title("📊 Marketing Strategy Decision Tool")
     st.markdown("*Data-driven marketing decisions using proven frameworks*")
     
@@ -443,190 +1164,8 @@ if st.session_state.app_mode == "Marketing Strategy":
     
     st.markdown("---")
     
-    # Step 1: Product Information
-    if st.session_state.step == 1:
-        st.header("Step 1: Product Information")
-        st.markdown("Select your product type and lifecycle stage")
-        
-        st.subheader("Product Type")
-        cols = st.columns(2)
-        for i, (key, value) in enumerate(PRODUCT_TYPES.items()):
-            with cols[i % 2]:
-                if st.button(f"**{value['name']}**\n\n{value['desc']}", key=f"prod_{key}", use_container_width=True):
-                    st.session_state.product_type = key
-        
-        if st.session_state.product_type:
-            st.success(f"✓ Selected: {PRODUCT_TYPES[st.session_state.product_type]['name']}")
-        
-        st.subheader("Product Lifecycle Stage")
-        cols = st.columns(4)
-        for i, stage in enumerate(PRODUCT_STAGES):
-            with cols[i]:
-                if st.button(stage, key=f"stage_{stage}", use_container_width=True):
-                    st.session_state.product_stage = stage
-        
-        if st.session_state.product_stage:
-            st.success(f"✓ Selected: {st.session_state.product_stage}")
-    
-    # Step 2: Market Strategy
-    elif st.session_state.step == 2:
-        st.header("Step 2: Market Strategy (Ansoff Matrix)")
-        st.markdown("Choose your market-product combination")
-        
-        cols = st.columns(2)
-        for i, (key, value) in enumerate(MARKET_TYPES.items()):
-            with cols[i % 2]:
-                if st.button(f"**{value['name']}**\n\nStrategy: {value['strategy']}", key=f"market_{key}", use_container_width=True):
-                    st.session_state.market_type = key
-        
-        if st.session_state.market_type:
-            st.success(f"✓ Selected: {MARKET_TYPES[st.session_state.market_type]['strategy']}")
-    
-    # Step 3: Customer Segmentation
-    elif st.session_state.step == 3:
-        st.header("Step 3: Customer Segmentation")
-        st.markdown("Select relevant segmentation criteria for targeting")
-        
-        for key, value in SEGMENTATION_OPTIONS.items():
-            checked = st.checkbox(
-                f"**{value['name']}** - {value['desc']}", 
-                value=key in st.session_state.segmentation, 
-                key=f"seg_{key}"
-            )
-            if checked and key not in st.session_state.segmentation:
-                st.session_state.segmentation.append(key)
-            elif not checked and key in st.session_state.segmentation:
-                st.session_state.segmentation.remove(key)
-        
-        if st.session_state.segmentation:
-            st.success(f"✓ Selected {len(st.session_state.segmentation)} segmentation criteria")
-    
-    # Step 4: Competitive Forces
-    elif st.session_state.step == 4:
-        st.header("Step 4: Porter's 5 Forces Analysis")
-        st.markdown("Assess competitive forces in your market")
-        
-        forces = [
-            ('rivalry', 'Existing Rivalry Between Firms'),
-            ('suppliers', 'Bargaining Power of Suppliers'),
-            ('buyers', 'Bargaining Power of Customers'),
-            ('newEntrants', 'Threat of New Entrants'),
-            ('substitutes', 'Threat of Substitutes')
-        ]
-        
-        for key, label in forces:
-            st.subheader(label)
-            cols = st.columns(3)
-            for i, option in enumerate(['Low', 'Medium', 'High']):
-                with cols[i]:
-                    if st.button(option, key=f"force_{key}_{option}", use_container_width=True):
-                        st.session_state.competitive_forces[key] = option
-            
-            if key in st.session_state.competitive_forces:
-                st.success(f"✓ Selected: {st.session_state.competitive_forces[key]}")
-    
-    # Step 5: Distribution Channel
-    elif st.session_state.step == 5:
-        st.header("Step 5: Distribution Channel Strategy")
-        st.markdown("Configure your distribution approach")
-        
-        st.info("**Distribution Channel Selection Framework**\n\nChoose based on product customization level and target market concentration")
-        
-        st.subheader("Product Customization Level")
-        cols = st.columns(2)
-        with cols[0]:
-            if st.button("**High Customization**\n\nTailored products, bespoke services", key="cust_high", use_container_width=True):
-                st.session_state.distribution_config['customization'] = 'high'
-        with cols[1]:
-            if st.button("**Low Customization**\n\nStandardized products, mass market", key="cust_low", use_container_width=True):
-                st.session_state.distribution_config['customization'] = 'low'
-        
-        if st.session_state.distribution_config['customization']:
-            st.success(f"✓ Selected: {st.session_state.distribution_config['customization'].title()} Customization")
-        
-        st.subheader("Target Market Concentration")
-        cols = st.columns(2)
-        with cols[0]:
-            if st.button("**Concentrated Market**\n\nFew large customers, B2B, niche segments", key="market_conc", use_container_width=True):
-                st.session_state.distribution_config['market_concentration'] = 'concentrated'
-        with cols[1]:
-            if st.button("**Fragmented Market**\n\nMany small customers, B2C, mass market", key="market_frag", use_container_width=True):
-                st.session_state.distribution_config['market_concentration'] = 'fragmented'
-        
-        if st.session_state.distribution_config['market_concentration']:
-            st.success(f"✓ Selected: {st.session_state.distribution_config['market_concentration'].title()} Market")
-        
-        # Show recommendation
-        channel = get_distribution_recommendation()
-        if channel:
-            st.markdown("---")
-            st.success("### 🎯 Recommended Distribution Channel")
-            st.markdown(f"## {channel['name']}")
-            st.markdown(f"**Model:** {channel['model']}")
-            st.markdown(channel['description'])
-            
-            cols = st.columns(2)
-            with cols[0]:
-                st.markdown("**✓ Pros:**")
-                for pro in channel['pros']:
-                    st.markdown(f"- {pro}")
-            with cols[1]:
-                st.markdown("**⚠ Cons:**")
-                for con in channel['cons']:
-                    st.markdown(f"- {con}")
-            
-            st.subheader("Select Specific Channel Type")
-            st.session_state.selected_channel = st.selectbox(
-                "Choose a channel option:",
-                [''] + channel['examples'],
-                index=0 if not st.session_state.selected_channel else 
-                      channel['examples'].index(st.session_state.selected_channel) + 1 
-                      if st.session_state.selected_channel in channel['examples'] else 0
-            )
-            
-            if st.session_state.selected_channel:
-                if st.button("📱 Book Channel Setup via WhatsApp", use_container_width=True, type="primary"):
-                    whatsapp_url = generate_whatsapp_message()
-                    st.markdown(f"[Click here to open WhatsApp]({whatsapp_url})")
-    
-    # Step 6: Results
-    elif st.session_state.step == 6:
-        st.header("Complete Marketing Recommendations")
-        st.markdown("Strategic recommendations based on your inputs")
-        
-        recommendations = get_recommendations()
-        
-        st.success(f"### 🎯 Core Strategy: {recommendations['strategy']}")
-        
-        cols = st.columns(2)
-        with cols[0]:
-            st.info("### 📈 Promotion Strategy")
-            st.markdown(recommendations['promotion'])
-        with cols[1]:
-            st.info("### 💰 Pricing Strategy")
-            st.markdown(recommendations['pricing'])
-        
-        st.info("### 📦 Distribution Strategy")
-        st.markdown(recommendations['distribution'])
-        
-        if st.session_state.selected_channel:
-            st.markdown(f"**Selected Channel:** {st.session_state.selected_channel}")
-            if st.button("📱 Contact via WhatsApp", key="whatsapp_final"):
-                whatsapp_url = generate_whatsapp_message()
-                st.markdown(f"[Click here to open WhatsApp]({whatsapp_url})")
-        
-        st.warning("### 💡 Key Messaging Insights")
-        for msg in recommendations['messaging']:
-            st.markdown(f"- {msg}")
-        
-        st.caption("*Note: These recommendations are based on established marketing frameworks including Consumer Behavior Model (Engel, Blackwell, Miniard & Harcourt 2001), Porter's 5 Forces, Ansoff Matrix, Product Lifecycle, and Distribution Channel Strategy.*")
-        
-        # Link to Promotion Mix
-        st.markdown("---")
-        st.info("### 🎨 Ready to create your promotion materials?")
-        if st.button("Go to Promotion Mix Tool →", type="primary", use_container_width=True):
-            st.session_state.app_mode = "Promotion Mix"
-            st.rerun()
+    with metrics.timer(f"step_{st.session_state.step}"):
+        STEP_RENDERERS[st.session_state.step]()
     
     # Navigation buttons
     st.markdown("---")
@@ -634,41 +1173,25 @@ if st.session_state.app_mode == "Marketing Strategy":
     
     with cols[0]:
         if st.session_state.step > 1:
-            if st.button("← Previous", use_container_width=True):
+            if st.button("← Previous", width='stretch'):
                 st.session_state.step -= 1
                 st.rerun()
     
     with cols[1]:
-        can_proceed = False
-        if st.session_state.step == 1:
-            can_proceed = st.session_state.product_type and st.session_state.product_stage
-        elif st.session_state.step == 2:
-            can_proceed = st.session_state.market_type
-        elif st.session_state.step == 3:
-            can_proceed = len(st.session_state.segmentation) > 0
-        elif st.session_state.step == 4:
-            can_proceed = len(st.session_state.competitive_forces) == 5
-        elif st.session_state.step == 5:
-            can_proceed = st.session_state.distribution_config['customization'] and st.session_state.distribution_config['market_concentration']
-        
         if st.session_state.step < 6:
-            if st.button("Next →", disabled=not can_proceed, use_container_width=True, type="primary"):
+            if st.button("Next →", disabled=not can_proceed(), width='stretch', type="primary"):
                 st.session_state.step += 1
                 st.rerun()
         else:
-            if st.button("🔄 Start New Analysis", use_container_width=True, type="primary"):
-                st.session_state.step = 1
-                st.session_state.product_type = None
-                st.session_state.product_stage = None
-                st.session_state.market_type = None
-                st.session_state.segmentation = []
-                st.session_state.competitive_forces = {}
-                st.session_state.distribution_config = {'customization': None, 'market_concentration': None}
-                st.session_state.selected_channel = None
+            if st.button("🔄 Start New Analysis", width='stretch', type="primary"):
+                # Keep the finished analysis in the history
+                save_plan()
+                defaults = session_defaults()
+                st.session_state.update({key: defaults[key] for key in WIZARD_KEYS})
                 st.rerun()
 
 # Promotion Mix Tool
-else:
+def render_promotion_tool():
     st.title("🎨 Promotion Mix Strategy Tool")
     st.markdown("*Get personalized promotional activity recommendations with design resources*")
     
@@ -689,21 +1212,29 @@ else:
             product_stage_input = st.selectbox(
                 "📈 Product Stage",
                 [''] + PRODUCT_STAGES,
+                key='promotion_stage',
                 index=PRODUCT_STAGES.index(st.session_state.product_stage) + 1 if st.session_state.product_stage else 0
             )
         
         with cols[2]:
-            st.session_state.target_audience = st.selectbox(
+            target_audience = st.selectbox(
                 "👥 Target Audience",
-                ['', 'Customer Centric (B2C)', 'Partner Centric (B2B)', 'Mixed Audience'],
-                index=0
+                [''] + AUDIENCE_OPTIONS,
+                index=AUDIENCE_OPTIONS.index(st.session_state.target_audience) + 1 if st.session_state.target_audience in AUDIENCE_OPTIONS else 0
             )
+            # A new audience re-ranks the activities; start again from the top
+            if target_audience != st.session_state.target_audience:
+                st.session_state.cards_page = 0
+            st.session_state.target_audience = target_audience
         
-        if st.button("🔍 Generate Promotion Mix Strategy", type="primary", use_container_width=True):
+        if st.button("🔍 Generate Promotion Mix Strategy", type="primary", width='stretch'):
             if product_type_input and product_stage_input and st.session_state.target_audience:
-                st.session_state.selected_activities = []
+                st.session_state.activity_mask = 0
+                st.session_state.cards_page = 0
                 st.rerun()
     
+    render_catalog_search()
+    
     # Results section
     if st.session_state.target_audience and product_stage_input:
         st.markdown("---")
@@ -718,8 +1249,12 @@ else:
         
         st.markdown("---")
         
-        # Get recommendations
-        recommendations = get_promotion_recommendations()
+        # Get recommendations, one page of the full ranking at a time
+        recommendations, total_recommendations = get_promotion_page()
+        if not recommendations and st.session_state.cards_page:
+            # The catalog shrank below this page; show the last one instead
+            st.session_state.cards_page = max(0, -(-total_recommendations // engine.PROMOTION_PAGE_SIZE) - 1)
+            recommendations, total_recommendations = get_promotion_page()
         
         if recommendations:
             # Header with count
@@ -727,65 +1262,15 @@ else:
             with cols[0]:
                 st.subheader("Recommended Promotional Activities")
             with cols[1]:
-                if st.session_state.selected_activities:
-                    st.success(f"✓ {len(st.session_state.selected_activities)} Selected")
+                render_selection_count()
             
             # Activity cards
             for rec in recommendations:
-                with st.expander(f"{'✓ ' if rec['tool'] in st.session_state.selected_activities else ''}**{rec['tool']}** - {rec['reasoning']}", 
-                               expanded=False):
-                    
-                    cols = st.columns([3, 1])
-                    with cols[0]:
-                        st.markdown(f"**Type:** {rec['type'].replace('-', ' ').title()}")
-                        st.markdown(f"**Partner Focus:** {rec['partner'] or 'N/A'}")
-                        st.markdown(f"**Customer Focus:** {rec['customer'] or 'N/A'}")
-                    with cols[1]:
-                        priority_class = "priority-high" if rec['score'] == 3 else "priority-medium"
-                        priority_text = "High Priority" if rec['score'] == 3 else "Medium Priority"
-                        st.markdown(f'<span class="{priority_class}">{priority_text}</span>', unsafe_allow_html=True)
-                    
-                    # Toggle selection
-                    if rec['tool'] in st.session_state.selected_activities:
-                        if st.button(f"Remove from Mix", key=f"remove_{rec['tool']}", use_container_width=True):
-                            st.session_state.selected_activities.remove(rec['tool'])
-                            st.rerun()
-                    else:
-                        if st.button(f"Add to Mix", key=f"add_{rec['tool']}", type="primary", use_container_width=True):
-                            st.session_state.selected_activities.append(rec['tool'])
-                            st.rerun()
-                    
-                    # Design resources
-                    if rec['resources']:
-                        st.markdown("---")
-                        st.markdown("**🎨 Design Resources:**")
-                        for resource in rec['resources']:
-                            cols = st.columns([1, 4, 1])
-                            with cols[0]:
-                                st.markdown(f"{resource['icon']}")
-                            with cols[1]:
-                                st.markdown(f"**{resource['name']}** - {resource['desc']}")
-                            with cols[2]:
-                                st.link_button("Open", resource['url'], use_container_width=True)
+                st.fragment(render_activity_card, key=activity_fragment_key(rec['tool']))(rec)
+            render_cards_pager(total_recommendations)
             
             # Selected activities summary
-            if st.session_state.selected_activities:
-                st.markdown("---")
-                st.success("### 🎯 Your Selected Promotion Mix")
-                
-                cols = st.columns(3)
-                for i, activity in enumerate(st.session_state.selected_activities):
-                    with cols[i % 3]:
-                        st.markdown(f"**{i+1}.** {activity}")
-                
-                st.markdown("---")
-                cols = st.columns(2)
-                with cols[0]:
-                    if st.button("📄 Export as PDF", use_container_width=True):
-                        st.info("PDF export functionality coming soon!")
-                with cols[1]:
-                    if st.button("✉️ Share via Email", use_container_width=True):
-                        st.info("Email sharing functionality coming soon!")
+            render_selection_summary()
             
             # Pro tip
             st.markdown("---")
@@ -794,11 +1279,32 @@ else:
     else:
         st.info("👆 Fill in the details above and click 'Generate Promotion Mix Strategy' to get recommendations.")
 
-# Footer
-st.markdown("---")
-st.markdown("""
+with profiled_run():
+    if st.session_state.app_mode == "Marketing Strategy":
+        render_strategy_tool()
+    else:
+        render_promotion_tool()
+
+    # Lazy: the history database is only queried while a panel is open
+    history_panel = st.expander("📚 Plan History", key='history_open', on_change='rerun')
+    if history_panel.open:
+        with history_panel:
+            render_plan_history()
+
+    analytics_panel = st.expander("📈 Plan Analytics", key='analytics_open', on_change='rerun')
+    if analytics_panel.open:
+        with analytics_panel:
+            render_plan_analytics()
+
+    sync_query_params()
+
+    # Footer
+    st.markdown("---")
+    st.markdown("""
 <div style='text-align: center; color: #666; padding: 20px;'>
     <p><strong>Marketing Strategy & Promotion Mix Tool</strong></p>
     <p>Built with Streamlit | Based on established marketing frameworks</p>
 </div>
 """, unsafe_allow_html=True)
+
+prewarm()
@@ -0,0 +1,133 @@
+# batch.py - Headless batch scoring of JSONL product profiles
+#
+# Usage:
+#   python batch.py profiles.jsonl -o results.jsonl --workers 8
+#
+# Each input line is a JSON object using the same fields as the wizard:
+#   {"id": "sku-1", "product_type": "fmcg", "product_stage": "Growth",
+#    "market_type": "existing-new", "segmentation": ["loyalty"],
+#    "competitive_forces": {"rivalry": "High"},
+#    "distribution_config": {"customization": "low", "market_concentration": "fragmented"},
+#    "target_audience": "Customer Centric (B2C)"}
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import catalog
+import engine
+
+
+def score_profile(profile):
+    product_type = profile.get('product_type')
+    # Free-text product description, as typed into the Promotion Mix tool
+    product_type_input = profile.get('product_type_input')
+    product_types = catalog.PRODUCT_TYPES
+    if product_type_input is None and product_type in product_types:
+        product_type_input = product_types[product_type]['name']
+
+    recommendations = engine.get_recommendations(
+        product_type,
+        profile.get('product_stage'),
+        profile.get('market_type'),
+        profile.get('segmentation') or (),
+        profile.get('competitive_forces') or {},
+        profile.get('distribution_config') or {}
+    )
+    channel = engine.get_distribution_recommendation(profile.get('distribution_config') or {})
+    promotion = engine.get_promotion_recommendations(profile.get('target_audience'))
+
+    return {
+        'id': profile.get('id'),
+        'recommendations': {**recommendations._asdict(), 'messaging': list(recommendations.messaging)},
+        'channel': {'name': channel['name'], 'model': channel['model']} if channel else None,
+        'promotion_mix': [
+            {'tool': rec['tool'], 'score': rec['score'], 'type': rec['type'], 'reasoning': rec['reasoning']}
+            for rec in promotion
+        ],
+        'stage_advice': engine.get_stage_advice(profile.get('product_stage')),
+        'type_advice': engine.get_type_advice(product_type_input)
+    }
+
+
+def score_lines(lines):
+    """Score a chunk of raw JSONL lines, returning serialized result lines."""
+    out = []
+    for line in lines:
+        try:
+            result = score_profile(json.loads(line))
+        except (ValueError, TypeError, AttributeError) as exc:
+            result = {'error': str(exc), 'input': line.strip()[:200]}
+        out.append(json.dumps(result, ensure_ascii=False) + '\n')
+    return out
+
+
+def _chunks(infile, chunk_size):
+    lines = (line for line in infile if line.strip())
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(infile, outfile, workers=None, chunk_size=500):
+    """Stream profiles from infile to outfile and return the number of rows.
+
+    At most ``2 * workers`` chunks are in flight at once, so memory stays
+    bounded regardless of input size. Output order matches input order.
+    """
+    rows = 0
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in _chunks(infile, chunk_size):
+            outfile.writelines(score_lines(chunk))
+            rows += len(chunk)
+        return rows
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        max_pending = 2 * workers
+        pending = deque()
+        for chunk in _chunks(infile, chunk_size):
+            pending.append(pool.submit(score_lines, chunk))
+            if len(pending) >= max_pending:
+                results = pending.popleft().result()
+                outfile.writelines(results)
+                rows += len(results)
+        while pending:
+            results = pending.popleft().result()
+            outfile.writelines(results)
+            rows += len(results)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score JSONL product profiles with the marketing strategy engine.')
+    parser.add_argument('input', help="JSONL file of product profiles ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL output file ('-' for stdout)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Worker processes (default: CPU count, 1 = in-process)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Profiles per worker task')
+    args = parser.parse_args(argv)
+
+    infile = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    try:
+        rows = run(infile, outfile, args.workers, args.chunk_size)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"Scored {rows} profiles in {elapsed:.2f}s ({rate:,.0f} rows/sec)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# cold_start.py - Cold-start benchmark for app.py with a startup budget
+#
+# Usage:
+#   python benchmarks/cold_start.py --runs 5
+#   python benchmarks/cold_start.py --runs 5 --budget benchmarks/startup_budget.json --output startup.json
+#
+# Every run is a fresh interpreter, like a new replica. It measures importing
+# Streamlit, importing the app's own modules (the imports at the top of
+# app.py), the first script run (the first session's first render), how long
+# the background index prewarm runs after it, a second session's first render
+# once the process is warm, and the first render of the results step. Medians
+# across runs are checked against the budget, and the script exits non-zero
+# when any metric is over.
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+APP_PATH = Path(__file__).resolve().parent.parent / 'app.py'
+DEFAULT_BUDGET = Path(__file__).resolve().parent / 'startup_budget.json'
+METRICS = ('streamlit_import_ms', 'app_import_ms', 'first_render_ms', 'prewarm_ms', 'new_session_ms',
+           'first_results_ms')
+PREWARM_THREAD = 'catalog-prewarm'
+
+
+def app_modules():
+    """The repository modules app.py imports at the top level, in order."""
+    modules = []
+    for node in ast.parse(APP_PATH.read_text(encoding='utf-8')).body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules += [name for name in names if (APP_PATH.parent / f'{name}.py').exists() and name not in modules]
+    return modules
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def measure():
+    """One cold start in this (fresh) process; returns {metric: ms}."""
+    sys.path.insert(0, str(APP_PATH.parent))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    result = {}
+
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+    result['streamlit_import_ms'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    for module in app_modules():
+        __import__(module)
+    result['app_import_ms'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    at = AppTest.from_file(str(APP_PATH), default_timeout=60).run()
+    result['first_render_ms'] = _elapsed_ms(start)
+    if at.exception:
+        raise RuntimeError(f"first render raised: {at.exception[0].message}")
+
+    start = time.perf_counter()
+    for thread in threading.enumerate():
+        if thread.name == PREWARM_THREAD:
+            thread.join()
+    result['prewarm_ms'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    AppTest.from_file(str(APP_PATH), default_timeout=60).run()
+    result['new_session_ms'] = _elapsed_ms(start)
+
+    # Walk the first session to the results step, which needs the recommendation index
+    from rerun_latency import interactions
+    for name, prepare in interactions():
+        target = prepare(at)
+        start = time.perf_counter()
+        target.run()
+        if at.exception:
+            raise RuntimeError(f"{name} raised: {at.exception[0].message}")
+        if at.session_state.step == 6:
+            result['first_results_ms'] = _elapsed_ms(start)
+            break
+    return result
+
+
+def run_benchmark(runs, env=None):
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, __file__, '--child'], capture_output=True, text=True, check=True,
+            env={**os.environ, **(env or {})}
+        )
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'runs': runs
+        },
+        'startup': {
+            metric: {
+                'median_ms': round(float(np.median([s[metric] for s in samples])), 3),
+                'max_ms': round(float(np.max([s[metric] for s in samples])), 3)
+            }
+            for metric in METRICS
+        }
+    }
+
+
+def over_budget(report, budget):
+    """Return a list of messages for metrics whose median exceeds the budget."""
+    return [
+        f"{metric}: {report['startup'][metric]['median_ms']:.1f} ms > {limit} ms"
+        for metric, limit in budget.items()
+        if metric in report['startup'] and report['startup'][metric]['median_ms'] > limit
+    ]
+
+
+def print_report(report, budget=None, file=sys.stdout):
+    print(f"{'metric':<22}{'median ms':>11}{'max ms':>10}{'budget ms':>11}", file=file)
+    for metric, stats in report['startup'].items():
+        limit = (budget or {}).get(metric)
+        print(f"{metric:<22}{stats['median_ms']:>11.1f}{stats['max_ms']:>10.1f}{'-' if limit is None else limit:>11}",
+              file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cold import and first-render time of app.py.')
+    parser.add_argument('-n', '--runs', type=int, default=5, help='Fresh interpreters to start')
+    parser.add_argument('--budget', default=str(DEFAULT_BUDGET),
+                        help='JSON {metric: max median ms}; exit 1 when exceeded ("" to skip)')
+    parser.add_argument('-o', '--output', help='Write results to this JSON file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure()))
+        return 0
+
+    # Keep background link checks (network I/O) out of the measurements
+    report = run_benchmark(args.runs, {'MARKETING_LINK_CHECK': '0'})
+    budget = json.loads(Path(args.budget).read_text()) if args.budget else None
+    print_report(report, budget)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n')
+
+    if budget:
+        failures = over_budget(report, budget)
+        if failures:
+            print("\nStartup over budget:", file=sys.stderr)
+            for line in failures:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"\nStartup within budget ({args.budget})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
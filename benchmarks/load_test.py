@@ -0,0 +1,233 @@
+# load_test.py - Concurrent-session load test for app.py, driven through AppTest
+#
+# Usage:
+#   python benchmarks/load_test.py --concurrency 1,2,4,8 --sessions 5
+#   python benchmarks/load_test.py --concurrency 4,16 --sessions 10 --output load.json
+#
+# Each concurrency level starts that many worker processes, which begin
+# together once warmed up. A worker plays --sessions simulated users back to
+# back, each following a randomized click path through the 6-step wizard and
+# the Promotion Mix cards and toggles, and keeps every finished session alive so its
+# state stays resident. AppTest is not thread-safe, so concurrency comes from
+# processes rather than threads.
+#
+# RSS per session is a worker's resident-memory growth divided by the sessions
+# it holds, measured from after its warm-up walk (imports and shared caches
+# loaded). A real server hosts every session in one process, so that marginal
+# figure - not the worker baseline - is what grows with the number of users.
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+from rerun_latency import APP_PATH, _button, _find, _next, _open_card
+
+sys.path.insert(0, str(APP_PATH.parent))
+import catalog  # noqa: E402
+from catalog import AUDIENCE_OPTIONS, COMPETITIVE_FORCES, FORCE_LEVELS, PRODUCT_STAGES  # noqa: E402
+
+
+def rss_kib():
+    """Current resident set size of this process in KiB."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024
+    except OSError:
+        # No procfs (macOS): fall back to the peak, reported in bytes there
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if sys.platform == 'darwin' else peak
+
+
+def _choose_channel(at, rng):
+    selectbox = _find(at.selectbox, label='Choose a channel option:')
+    if selectbox is None:
+        at.run()
+        selectbox = _find(at.selectbox, label='Choose a channel option:')
+    return selectbox.set_value(rng.choice(selectbox.options[1:]))
+
+
+def _toggle_activity(at, rng):
+    buttons = [b for b in at.button if b.key and b.key.startswith(('add_', 'remove_'))]
+    if not buttons:
+        at.run()
+        buttons = [b for b in at.button if b.key and b.key.startswith(('add_', 'remove_'))]
+    return rng.choice(buttons).click()
+
+
+def _open_random_card(at, rng):
+    cards = [e for e in at.expander if e.key and e.key.startswith('card_')]
+    if not cards:
+        at.run()
+        cards = [e for e in at.expander if e.key and e.key.startswith('card_')]
+    return _open_card(at, rng.randrange(len(cards)))
+
+
+def click_path(rng, toggles):
+    """(name, prepare) pairs for one randomized user; prepare() stages a change and returns what to run."""
+    cat = catalog.current()
+    product_type = rng.choice(list(cat.product_types))
+    stage = rng.choice(PRODUCT_STAGES)
+    market = rng.choice(list(cat.market_types))
+    segments = rng.sample(list(cat.segmentation_options), rng.randint(1, 3))
+
+    path = [
+        ('initial_load', lambda at: at),
+        ('step1_select_type', lambda at: _button(at, f'prod_{product_type}')),
+        ('step1_select_stage', lambda at: _button(at, f'stage_{stage}')),
+        ('next_step_1_to_2', _next),
+        ('step2_select_market', lambda at: _button(at, f'market_{market}')),
+        ('next_step_2_to_3', _next),
+    ]
+    path += [('step3_toggle_segment', lambda at, key=key: at.checkbox(key=f'seg_{key}').check()) for key in segments]
+    path.append(('next_step_3_to_4', _next))
+    path += [
+        (f'step4_rate_{key}', lambda at, key=key, level=rng.choice(FORCE_LEVELS): _button(at, f'force_{key}_{level}'))
+        for key, _ in COMPETITIVE_FORCES
+    ]
+    path += [
+        ('next_step_4_to_5', _next),
+        ('step5_customization', lambda at, key=rng.choice(('cust_high', 'cust_low')): _button(at, key)),
+        ('step5_concentration', lambda at, key=rng.choice(('market_conc', 'market_frag')): _button(at, key)),
+        ('step5_select_channel', lambda at: _choose_channel(at, rng)),
+        ('next_step_5_to_6', _next),
+        ('switch_to_promotion_mix', lambda at: at.sidebar.radio[0].set_value('Promotion Mix')),
+        ('promotion_set_audience', lambda at, audience=rng.choice(AUDIENCE_OPTIONS):
+            _find(at.selectbox, label='👥 Target Audience').set_value(audience)),
+    ]
+    # AppTest does not send expander state back, so a card is reopened before every toggle
+    path += [
+        ('promotion_open_card', lambda at: _open_random_card(at, rng)),
+        ('promotion_toggle_activity', lambda at: _toggle_activity(at, rng)),
+    ] * toggles
+    return path
+
+
+def run_session(rng, toggles, timeout):
+    """Play one user; return the AppTest session and its rerun latencies in ms."""
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    latencies = []
+    for name, prepare in click_path(rng, toggles):
+        target = prepare(at)
+        start = time.perf_counter()
+        target.run()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(f"{name} raised: {at.exception[0].message}")
+    return at, latencies
+
+
+def worker(sessions, seed, toggles, timeout, barrier):
+    rng = random.Random(seed)
+    run_session(rng, toggles, timeout)
+    baseline = rss_kib()
+    barrier.wait()
+
+    start = time.time()
+    live, latencies = [], []
+    for _ in range(sessions):
+        at, session_latencies = run_session(rng, toggles, timeout)
+        live.append(at)
+        latencies.extend(session_latencies)
+    end = time.time()
+    return {
+        'start': start,
+        'end': end,
+        'latencies': latencies,
+        'baseline_kib': baseline,
+        'per_session_kib': (rss_kib() - baseline) / sessions,
+    }
+
+
+def run_level(concurrency, sessions, seed, toggles, timeout):
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager, \
+            ProcessPoolExecutor(concurrency, mp_context=context) as pool:
+        barrier = manager.Barrier(concurrency)
+        futures = [
+            pool.submit(worker, sessions, seed * 10007 + concurrency * 101 + i, toggles, timeout, barrier)
+            for i in range(concurrency)
+        ]
+        results = [future.result() for future in futures]
+
+    latencies = np.concatenate([r['latencies'] for r in results])
+    wall = max(r['end'] for r in results) - min(r['start'] for r in results)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'concurrency': concurrency,
+        'sessions': concurrency * sessions,
+        'reruns': len(latencies),
+        'wall_s': round(wall, 3),
+        'reruns_per_s': round(len(latencies) / wall, 2),
+        'sessions_per_s': round(concurrency * sessions / wall, 3),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(latencies.max()), 3),
+        'worker_baseline_mib': round(float(np.median([r['baseline_kib'] for r in results])) / 1024, 1),
+        'rss_per_session_kib': round(float(np.median([r['per_session_kib'] for r in results])), 1),
+    }
+
+
+def run_load_test(levels, sessions, seed=0, toggles=4, timeout=60):
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'sessions_per_worker': sessions,
+            'toggles': toggles,
+            'seed': seed
+        },
+        'levels': [run_level(level, sessions, seed, toggles, timeout) for level in levels]
+    }
+
+
+def print_report(report, file=sys.stdout):
+    print(f"{'conc':>5}{'sessions':>10}{'reruns/s':>10}{'sess/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}{'base MiB':>10}{'KiB/sess':>10}", file=file)
+    for level in report['levels']:
+        print(f"{level['concurrency']:>5}{level['sessions']:>10}{level['reruns_per_s']:>10.1f}"
+              f"{level['sessions_per_s']:>9.2f}{level['p50_ms']:>9.1f}{level['p95_ms']:>9.1f}{level['p99_ms']:>9.1f}"
+              f"{level['max_ms']:>9.1f}{level['worker_baseline_mib']:>10.1f}{level['rss_per_session_kib']:>10.1f}",
+              file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test app.py with concurrent simulated sessions.')
+    parser.add_argument('-c', '--concurrency', default='1,2,4,8',
+                        help='Comma-separated numbers of simultaneous sessions (default 1,2,4,8)')
+    parser.add_argument('-s', '--sessions', type=int, default=5, help='Sessions each worker plays and keeps alive')
+    parser.add_argument('--toggles', type=int, default=4, help='Promotion Mix add/remove clicks per session')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the randomized click paths')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds allowed per rerun')
+    parser.add_argument('-o', '--output', help='Write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    # Saved plans and leads go to a throwaway directory, not the real databases
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ.setdefault('MARKETING_HISTORY_DB', str(Path(scratch) / 'history.db'))
+        os.environ.setdefault('MARKETING_LEADS_DB', str(Path(scratch) / 'leads.db'))
+        levels = [int(level) for level in args.concurrency.split(',')]
+        report = run_load_test(levels, args.sessions, args.seed, args.toggles, args.timeout)
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# rerun_latency.py - Rerun-latency benchmark for app.py, driven through AppTest
+#
+# Usage:
+#   python benchmarks/rerun_latency.py --iterations 20 --output baseline.json
+#   python benchmarks/rerun_latency.py --compare baseline.json --threshold 0.25
+#
+# Every iteration walks the 6-step wizard, switches to the Promotion Mix tool,
+# opens an activity card and adds then removes that activity in a fresh session. Script run time is
+# recorded per interaction; allocated memory is measured in separate traced
+# passes so tracemalloc overhead does not skew the timings.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = Path(__file__).resolve().parent.parent / 'app.py'
+DEFAULT_METRICS = ('p50_ms', 'p95_ms', 'peak_kib')
+
+# Keep background link checks (network I/O) out of the measurements
+os.environ.setdefault('MARKETING_LINK_CHECK', '0')
+
+FORCE_KEYS = ('rivalry', 'suppliers', 'buyers', 'newEntrants', 'substitutes')
+
+
+def _find(elements, key=None, label=None):
+    for element in elements:
+        if (key is not None and element.key == key) or (label is not None and element.label == label):
+            return element
+    return None
+
+
+def _button(at, key=None, label=None):
+    # Fragment reruns only return the rerun fragment's elements, so refresh
+    # the full tree when the widget we need is not in it.
+    button = _find(at.button, key, label)
+    if button is None:
+        at.run()
+        button = _find(at.button, key, label)
+    if button is None:
+        raise RuntimeError(f"Button not found: {key or label}")
+    return button.click()
+
+
+def _next(at):
+    return _button(at, label='Next →')
+
+
+def _open_card(at, index=0):
+    # Card bodies (and their Add/Remove buttons) only render while the card is open
+    cards = [e for e in at.expander if e.key and e.key.startswith('card_')]
+    if not cards:
+        at.run()
+        cards = [e for e in at.expander if e.key and e.key.startswith('card_')]
+    at.session_state[cards[index].key] = True
+    return at
+
+
+def interactions():
+    """(name, prepare) pairs; prepare() stages a change and returns what to run."""
+    flow = [
+        ('initial_load', lambda at: at),
+        ('step1_select_type', lambda at: _button(at, 'prod_fmcg')),
+        ('step1_select_stage', lambda at: _button(at, 'stage_Growth')),
+        ('next_step_1_to_2', _next),
+        ('step2_select_market', lambda at: _button(at, 'market_existing-new')),
+        ('next_step_2_to_3', _next),
+        ('step3_toggle_segment', lambda at: at.checkbox(key='seg_loyalty').check()),
+        ('next_step_3_to_4', _next),
+    ]
+    flow += [(f'step4_rate_{key}', lambda at, key=key: _button(at, f'force_{key}_High')) for key in FORCE_KEYS]
+    flow += [
+        ('next_step_4_to_5', _next),
+        ('step5_customization', lambda at: _button(at, 'cust_low')),
+        ('step5_concentration', lambda at: _button(at, 'market_frag')),
+        ('step5_select_channel', lambda at: _find(at.selectbox, label='Choose a channel option:').set_value('Supermarkets')),
+        ('next_step_5_to_6', _next),
+        ('switch_to_promotion_mix', lambda at: at.sidebar.radio[0].set_value('Promotion Mix')),
+        ('promotion_set_audience', lambda at: _find(at.selectbox, label='👥 Target Audience').set_value('Customer Centric (B2C)')),
+        ('promotion_open_card_to_add', _open_card),
+        ('promotion_add_activity', lambda at: next(b for b in at.button if b.key and b.key.startswith('add_')).click()),
+        # AppTest does not send expander state back, so the card closed on the last click
+        ('promotion_open_card_to_remove', _open_card),
+        ('promotion_remove_activity', lambda at: next(b for b in at.button if b.key and b.key.startswith('remove_')).click()),
+    ]
+    return flow
+
+
+def walk(timings=None, memory=None, timeout=30):
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    for name, prepare in interactions():
+        target = prepare(at)
+        if memory is not None:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        target.run()
+        elapsed = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"{name} raised: {at.exception[0].message}")
+        if timings is not None:
+            timings[name].append(elapsed * 1000)
+        if memory is not None:
+            memory[name].append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+
+
+def run_benchmark(iterations, memory_iterations, warmup=1):
+    for _ in range(warmup):
+        walk()
+    timings = defaultdict(list)
+    for _ in range(iterations):
+        walk(timings=timings)
+
+    memory = defaultdict(list)
+    tracemalloc.start()
+    try:
+        for _ in range(memory_iterations):
+            walk(memory=memory)
+    finally:
+        tracemalloc.stop()
+
+    results = {}
+    for name, samples in timings.items():
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        results[name] = {
+            'samples': len(samples),
+            'mean_ms': round(float(np.mean(samples)), 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'peak_kib': round(float(np.median(memory[name])), 1) if memory.get(name) else None
+        }
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'machine': platform.machine(),
+            'iterations': iterations,
+            'memory_iterations': memory_iterations
+        },
+        'interactions': results
+    }
+
+
+def compare(current, baseline, threshold, metrics=DEFAULT_METRICS):
+    """Return a list of regression messages; empty when within threshold."""
+    regressions = []
+    for name, stats in current['interactions'].items():
+        base = baseline.get('interactions', {}).get(name)
+        if not base:
+            continue
+        for metric in metrics:
+            old, new = base.get(metric), stats.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions.append(f"{name}.{metric}: {old} -> {new} (+{change:.0%})")
+    return regressions
+
+
+def print_report(report, file=sys.stdout):
+    print(f"{'interaction':<32}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>11}", file=file)
+    for name, stats in report['interactions'].items():
+        peak = '-' if stats['peak_kib'] is None else f"{stats['peak_kib']:.1f}"
+        print(f"{name:<32}{stats['samples']:>5}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{peak:>11}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure per-interaction rerun latency of app.py.')
+    parser.add_argument('-n', '--iterations', type=int, default=20, help='Timed walks through the app')
+    parser.add_argument('--memory-iterations', type=int, default=3, help='Walks traced with tracemalloc')
+    parser.add_argument('-o', '--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='Fail if results regress against this JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative regression (default 0.25 = 25%%)')
+    parser.add_argument('--metrics', default=','.join(DEFAULT_METRICS), help='Comma-separated metrics to compare')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.iterations, args.memory_iterations)
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n')
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, baseline, args.threshold, args.metrics.split(','))
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
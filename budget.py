@@ -0,0 +1,76 @@
+# budget.py - Vectorized budget allocation over saturating per-tool response curves
+from typing import NamedTuple
+
+import numpy as np
+
+from scoring import audience_mode
+
+# Tools without a 'response' entry in the catalog
+DEFAULT_RESPONSE = {'reach': 40, 'scale': 10000}
+
+# Response multipliers per tool type and lifecycle stage; missing types count 1.0
+STAGE_TYPE_WEIGHTS = {
+    'Introduction': {'advertising': 1.3, 'digital': 1.2, 'sales-promotion': 1.2, 'events': 1.2, 'pr': 1.1},
+    'Growth': {'advertising': 1.2, 'digital': 1.3, 'events': 1.1, 'relationship': 1.1},
+    'Maturity': {'sales-promotion': 1.3, 'relationship': 1.3, 'direct': 1.1},
+    'Decline': {'sales-promotion': 1.2, 'direct': 1.2, 'relationship': 1.1, 'advertising': 0.7, 'events': 0.8},
+}
+
+
+class Allocation(NamedTuple):
+    tools: list
+    spend: np.ndarray
+    response: np.ndarray
+    total_response: float
+    # Response gained per extra unit of budget at the optimum
+    marginal_return: float
+
+
+class BudgetOptimizer:
+    """Splits a budget to maximize sum(reach * weight * (1 - exp(-spend / scale))).
+
+    Each tool's curve saturates at its (stage- and audience-weighted) reach;
+    ``scale`` is the spend that gets 63% of the way there. The optimum
+    equalizes marginal returns across funded tools and is found in closed form.
+    """
+
+    def __init__(self, tools, scorer):
+        self.index = {name: i for i, name in enumerate(tools)}
+        responses = [{**DEFAULT_RESPONSE, **details.get('response', {})} for details in tools.values()]
+        self.reach = np.array([r['reach'] for r in responses], dtype=np.float64)
+        self.scale = np.array([r['scale'] for r in responses], dtype=np.float64)
+        # Focus scores 0/1/3 -> weights 0.25/0.5/1.0, so every selected tool stays fundable
+        self.audience_weights = 0.25 + 0.25 * scorer.scores
+        self.stage_weights = {
+            stage: np.array([weights.get(t, 1.0) for t in scorer.type_names])[scorer.type_codes]
+            for stage, weights in STAGE_TYPE_WEIGHTS.items()
+        }
+
+    def allocate(self, tools, budget, stage=None, audience=None):
+        idx = np.fromiter((self.index[tool] for tool in tools), dtype=np.intp, count=len(tools))
+        reach = self.reach[idx]
+        if stage in self.stage_weights:
+            reach = reach * self.stage_weights[stage][idx]
+        mode = audience_mode(audience)
+        if mode is not None:
+            reach = reach * self.audience_weights[mode, idx]
+        scale = self.scale[idx]
+        spend = np.zeros(len(idx))
+        if budget <= 0 or not len(idx):
+            return Allocation(list(tools), spend, spend.copy(), 0.0, float((reach / scale).max()) if len(idx) else 0.0)
+
+        # Funded tools satisfy reach/scale * exp(-spend/scale) = lambda, i.e.
+        # spend = scale * (ln(reach/scale) - ln lambda). Taking tools by falling
+        # marginal return at zero spend, ln lambda for the first j funded tools
+        # is (sum scale*ln m - budget) / sum scale; keep the largest consistent j.
+        log_m = np.log(reach / scale)
+        order = np.argsort(-log_m, kind='stable')
+        k_sorted, log_m_sorted = scale[order], log_m[order]
+        log_lambda = (np.cumsum(k_sorted * log_m_sorted) - budget) / np.cumsum(k_sorted)
+        funded = np.flatnonzero(log_m_sorted > log_lambda)[-1] + 1
+        log_lambda = log_lambda[funded - 1]
+
+        active = order[:funded]
+        spend[active] = scale[active] * (log_m[active] - log_lambda)
+        response = reach * (1 - np.exp(-spend / scale))
+        return Allocation(list(tools), spend, response, float(response.sum()), float(np.exp(log_lambda)))
@@ -0,0 +1,267 @@
+# catalog.py - Catalog data for the Marketing Strategy & Promotion Mix Tool
+#
+# Products, markets, segments, channels, promotion tools and the product-type
+# keyword lists live in JSON files
+# under data/ (or MARKETING_CATALOG_DIR). Each file is parsed on first use and
+# re-parsed when its mtime changes, so the catalog can be edited without
+# restarting the server. Parsed data is frozen (read-only mappings and tuples)
+# and shared by every session in the process. A changed file is parsed before
+# its version goes live; if it is missing, malformed (e.g. half-saved) or an
+# entry lacks a field the app reads, the previous version keeps being served
+# until the file is fixed.
+#
+# Every tool, segment, product type and market type has a stable "id", which
+# identifies it in session masks, shared plan links and saved plans. Entries
+# can be reordered or removed freely, but an id must never be changed or
+# reused; give a new entry the next unused id.
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+
+import metrics
+
+CATALOG_DIR = Path(os.environ.get('MARKETING_CATALOG_DIR', Path(__file__).resolve().parent / 'data'))
+
+# Seconds between mtime checks, so reruns don't stat the files every time
+RELOAD_CHECK_INTERVAL = 2.0
+
+# Public name -> data file
+SECTIONS = {
+    'COMMUNICATION_TOOLS': 'communication_tools.json',
+    'DISTRIBUTION_CHANNELS': 'distribution_channels.json',
+    'SEGMENTATION_OPTIONS': 'segmentation_options.json',
+    'PRODUCT_TYPES': 'product_types.json',
+    'MARKET_TYPES': 'market_types.json',
+    'PRODUCT_KEYWORDS': 'product_keywords.json',
+}
+
+# Sections whose entries carry a stable "id", and how many ids each has room
+# for in the fixed-width fields of plan tokens
+STABLE_IDS = {
+    'COMMUNICATION_TOOLS': 256,
+    'SEGMENTATION_OPTIONS': 16,
+    'PRODUCT_TYPES': 63,
+    'MARKET_TYPES': 15,
+}
+
+# Fields every entry of a section needs. A tool's name is its key
+REQUIRED_FIELDS = {
+    'COMMUNICATION_TOOLS': ('partner', 'customer', 'type', 'resources'),
+    'DISTRIBUTION_CHANNELS': ('name', 'model', 'description', 'pros', 'cons', 'examples'),
+    'SEGMENTATION_OPTIONS': ('name', 'desc'),
+    'PRODUCT_TYPES': ('name', 'desc'),
+    'MARKET_TYPES': ('name', 'strategy'),
+}
+RESOURCE_FIELDS = ('name', 'url', 'icon', 'desc')
+
+# Framework structure the recommendation rules are written against
+PRODUCT_STAGES = ['Introduction', 'Growth', 'Maturity', 'Decline']
+
+COMPETITIVE_FORCES = [
+    ('rivalry', 'Existing Rivalry Between Firms'),
+    ('suppliers', 'Bargaining Power of Suppliers'),
+    ('buyers', 'Bargaining Power of Customers'),
+    ('newEntrants', 'Threat of New Entrants'),
+    ('substitutes', 'Threat of Substitutes')
+]
+
+FORCE_LEVELS = ['Low', 'Medium', 'High']
+
+AUDIENCE_OPTIONS = ['Customer Centric (B2C)', 'Partner Centric (B2B)', 'Mixed Audience']
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _parse(directory, name):
+    path = directory / SECTIONS[name]
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path.name}: expected a JSON object")
+    for key, entry in data.items():
+        _check_entry(path, name, key, entry)
+    if name in STABLE_IDS:
+        seen = {}
+        for key, entry in data.items():
+            entry_id = entry.get('id') if isinstance(entry, dict) else None
+            if not isinstance(entry_id, int) or not 0 <= entry_id < STABLE_IDS[name]:
+                raise ValueError(f"{path.name}: {key!r} needs an integer id from 0 to {STABLE_IDS[name] - 1}")
+            if entry_id in seen:
+                raise ValueError(f"{path.name}: {key!r} and {seen[entry_id]!r} share id {entry_id}")
+            seen[entry_id] = key
+    return _freeze(data)
+
+
+def _check_entry(path, name, key, entry):
+    """Raise ValueError if an entry lacks a field the app reads."""
+    if name == 'PRODUCT_KEYWORDS':
+        if not (isinstance(entry, list) and all(isinstance(keyword, str) for keyword in entry)):
+            raise ValueError(f"{path.name}: {key!r} needs a list of keyword strings")
+        return
+    if not isinstance(entry, dict):
+        raise ValueError(f"{path.name}: {key!r} needs to be a JSON object")
+    missing = [field for field in REQUIRED_FIELDS[name] if field not in entry]
+    if missing:
+        raise ValueError(f"{path.name}: {key!r} is missing {', '.join(missing)}")
+    if name != 'COMMUNICATION_TOOLS':
+        return
+    for resource in entry['resources']:
+        if not isinstance(resource, dict) or any(field not in resource for field in RESOURCE_FIELDS):
+            raise ValueError(f"{path.name}: {key!r} has a resource without {', '.join(RESOURCE_FIELDS)}")
+    response = entry.get('response', {})
+    if not isinstance(response, dict):
+        raise ValueError(f"{path.name}: {key!r} response needs to be a JSON object")
+    for field in ('reach', 'scale'):
+        value = response.get(field, 1)
+        # Budget allocation takes log(reach / scale)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"{path.name}: {key!r} response {field} needs to be a positive number")
+
+
+def thaw(value):
+    """Plain dict/list copy of frozen catalog data, e.g. for JSON output."""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class Catalog:
+    """One version of the catalog. Sections parse lazily; derived indexes are memoized per version."""
+
+    def __init__(self, directory, mtimes, parsed=None):
+        self.directory = directory
+        self.version = mtimes
+        self._parsed = dict(parsed or {})
+        self._derived = {}
+        self._lock = threading.RLock()
+        self._build_locks = {}
+
+    def section(self, name):
+        try:
+            return self._parsed[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._parsed:
+                self._parsed[name] = _parse(self.directory, name)
+            return self._parsed[name]
+
+    def derived(self, build):
+        """Return build(self), computed once for this catalog version."""
+        try:
+            return self._derived[build]
+        except KeyError:
+            pass
+        # One lock per build, so a slow build (e.g. on the prewarm thread)
+        # doesn't hold up callers that need a different one
+        with self._lock:
+            lock = self._build_locks.setdefault(build, threading.RLock())
+        with lock:
+            if build not in self._derived:
+                self._derived[build] = build(self)
+            return self._derived[build]
+
+    def load_all(self):
+        """Parse every section now rather than on first use."""
+        for name in SECTIONS:
+            self.section(name)
+
+    @property
+    def communication_tools(self):
+        return self.section('COMMUNICATION_TOOLS')
+
+    @property
+    def distribution_channels(self):
+        return self.section('DISTRIBUTION_CHANNELS')
+
+    @property
+    def segmentation_options(self):
+        return self.section('SEGMENTATION_OPTIONS')
+
+    @property
+    def product_types(self):
+        return self.section('PRODUCT_TYPES')
+
+    @property
+    def market_types(self):
+        return self.section('MARKET_TYPES')
+
+    @property
+    def product_keywords(self):
+        return self.section('PRODUCT_KEYWORDS')
+
+
+_lock = threading.Lock()
+_current = None
+_next_check = 0.0
+# Versions (mtimes) that failed to load, and why the last one failed
+_rejected = None
+last_reload_error = None
+
+
+def _mtimes(directory):
+    """Modification time of each data file; None for a missing one."""
+    mtimes = []
+    for filename in SECTIONS.values():
+        try:
+            mtimes.append(os.stat(directory / filename).st_mtime_ns)
+        except FileNotFoundError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+def current():
+    """Return the live Catalog, swapping in a new version if a data file changed."""
+    global _current, _next_check
+    now = time.monotonic()
+    if _current is not None and now < _next_check:
+        return _current
+    with _lock:
+        if _current is None:
+            _current = Catalog(CATALOG_DIR, _mtimes(CATALOG_DIR))
+        elif now >= _next_check:
+            _reload()
+        _next_check = now + RELOAD_CHECK_INTERVAL
+        return _current
+
+
+def _reload():
+    """Swap in a new version if a data file changed and every changed file parses."""
+    global _current, _rejected, last_reload_error
+    mtimes = _mtimes(CATALOG_DIR)
+    if mtimes == _current.version or mtimes == _rejected:
+        return
+    # Carry over sections whose file did not change; parse the rest now
+    parsed = {}
+    try:
+        for (name, old), new in zip(zip(SECTIONS, _current.version), mtimes):
+            if old != new:
+                parsed[name] = _parse(CATALOG_DIR, name)
+            elif name in _current._parsed:
+                parsed[name] = _current._parsed[name]
+    except (OSError, ValueError) as exc:
+        # Keep serving the last good version until the files change again
+        _rejected = mtimes
+        last_reload_error = f"{type(exc).__name__}: {exc}"
+        metrics.REGISTRY.inc('catalog_reload_errors')
+        return
+    _current = Catalog(CATALOG_DIR, mtimes, parsed)
+    _rejected = last_reload_error = None
+
+
+def __getattr__(name):
+    # COMMUNICATION_TOOLS, PRODUCT_TYPES, ... always resolve to the live version
+    if name in SECTIONS:
+        return current().section(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,75 @@
+# classifier.py - Aho-Corasick keyword matching for free-text product types
+import functools
+from collections import deque
+
+# Distinct classification results kept per catalog version
+CLASSIFY_CACHE_SIZE = 4096
+
+
+class KeywordMatcher:
+    """Finds every occurrence of a fixed set of keywords in one pass over the text."""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state] += (keyword_id,)
+
+        # Breadth-first failure links; each state also reports its suffix matches
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] += self._output[self._fail[child]]
+
+    def find(self, text):
+        """Yield the id of each keyword occurrence in ``text``."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            yield from output[state]
+
+
+class ProductClassifier:
+    """Ranks categories for free text from a {category: [keyword, ...]} mapping.
+
+    A category scores one point per distinct keyword found (case-insensitive
+    substring match); ties go to the category listed first.
+    """
+
+    def __init__(self, keywords_by_category):
+        self.categories = tuple(keywords_by_category)
+        pairs = [(keyword.lower(), i) for i, category in enumerate(self.categories)
+                 for keyword in keywords_by_category[category]]
+        self.matcher = KeywordMatcher(keyword for keyword, _ in pairs)
+        self._category_of = tuple(i for _, i in pairs)
+        self.classify = functools.lru_cache(maxsize=CLASSIFY_CACHE_SIZE)(self._classify)
+
+    def _classify(self, text):
+        """Return ((category, confidence), ...), best first; confidences sum to 1."""
+        found = set(self.matcher.find(text.lower()))
+        if not found:
+            return ()
+        scores = [0] * len(self.categories)
+        for keyword_id in found:
+            scores[self._category_of[keyword_id]] += 1
+        ranked = sorted((i for i, score in enumerate(scores) if score), key=lambda i: -scores[i])
+        return tuple((self.categories[i], scores[i] / len(found)) for i in ranked)
@@ -0,0 +1,304 @@
+# engine.py - Recommendation logic shared by the Streamlit app and offline tools
+import itertools
+from typing import NamedTuple
+
+import numpy as np
+
+import catalog
+from catalog import PRODUCT_STAGES
+from budget import BudgetOptimizer
+from classifier import ProductClassifier
+from rules import Evaluation, Rule, RuleSet
+from simulation import build_model
+from scoring import PromotionScorer, audience_mode
+
+
+class Recommendation(NamedTuple):
+    strategy: str
+    pricing: str
+    promotion: str
+    distribution: str
+    messaging: tuple
+
+
+# Recommendation rules. Facts are 'product_type', 'product_stage',
+# 'market_type' and 'distribution' (catalog keys), 'force.<force>' (level),
+# 'segment.<segment>' (True when selected) and 'product_category' (from the
+# keyword classifier). Market strategies and distribution channels are added
+# per catalog version in _build_rules().
+RULES = [
+    # Lifecycle stage -> promotion and pricing strategy
+    Rule('promotion', (('product_stage', 'Introduction'),),
+         'Focus on Information & Advertising to build awareness. Use promotion to induce trial. Less sales promotion, more advertising investment.'),
+    Rule('pricing', (('product_stage', 'Introduction'),),
+         'Penetration pricing (low to gain market share) or Skimming pricing (high for innovative products)'),
+    Rule('promotion', (('product_stage', 'Growth'),),
+         'Increase advertising to build preference. Sales promotions to attract new consumers and increase consumption.'),
+    Rule('pricing', (('product_stage', 'Growth'),),
+         'Maintain or slightly reduce prices to match competition and maximize market share'),
+    Rule('promotion', (('product_stage', 'Maturity'),),
+         'Effort to induce different usages. More sales promotion, less advertising. Focus on attracting marginal customers and brand switching.'),
+    Rule('pricing', (('product_stage', 'Maturity'),),
+         'Competitive pricing, promotional pricing to defend market share'),
+    Rule('promotion', (('product_stage', 'Decline'),),
+         'Frequent sales promotions to liquidate stock. Extremely low advertising spend. Minimal promotional investment.'),
+    Rule('pricing', (('product_stage', 'Decline'),),
+         'Discount pricing to clear inventory, harvest profits'),
+
+    # Messaging, in display order: forces rated High, product type, segments
+    Rule('messaging', (('force.rivalry', 'High'),), 'Differentiate strongly - high rivalry requires clear positioning'),
+    Rule('messaging', (('force.buyers', 'High'),), 'Focus on value proposition - buyers have strong bargaining power'),
+    Rule('messaging', (('force.newEntrants', 'High'),), 'Build brand loyalty quickly - threat of new entrants is high'),
+    Rule('messaging', (('force.substitutes', 'High'),), 'Emphasize unique benefits - substitutes pose a threat'),
+    Rule('messaging', (('product_type', 'luxury'),), 'Premium positioning, emotional branding, exclusivity messaging'),
+    Rule('messaging', (('product_type', 'fmcg'),), 'Mass market appeal, convenience, value for money'),
+    Rule('messaging', (('product_type', 'electronics'),), 'Innovation focus, feature benefits, early adopter targeting'),
+    Rule('messaging', (('segment.loyalty', True),), 'Implement loyalty programs and retention marketing'),
+    Rule('messaging', (('segment.usage-rate', True),), 'Tailor messaging for heavy vs. light users differently'),
+    Rule('messaging', (('segment.psychographic', True),), 'Create lifestyle-based campaigns aligned with values'),
+
+    # Promotion Mix insights
+    Rule('stage_advice', (('product_stage', 'Introduction'),),
+         'Focus on awareness building through mass media, sampling, and trade shows. Consider promotional pricing.'),
+    Rule('stage_advice', (('product_stage', 'Growth'),),
+         'Expand distribution through trade incentives. Build brand loyalty with loyalty programs and CSR activities.'),
+    Rule('stage_advice', (('product_stage', 'Maturity'),),
+         'Maintain market share through competitive pricing, loyalty programs, and sustained advertising.'),
+    Rule('stage_advice', (('product_stage', 'Decline'),),
+         'Focus on cost efficiency. Use targeted promotions, liquidation sales, and focus on loyal customer base.'),
+    Rule('type_advice', (('product_category', 'consumer'),),
+         'Consumer goods benefit from mass media advertising, POP displays, sampling events, and loyalty programs.'),
+    Rule('type_advice', (('product_category', 'industrial'),),
+         'Industrial products require trade shows, facility tours, trade discounts, and direct relationship building.'),
+    Rule('type_advice', (('product_category', 'premium'),),
+         'Premium products benefit from selective advertising, experiential events, and exclusive partnerships.'),
+    Rule('type_advice', (('product_category', 'service'),),
+         'Services require demonstration through sampling, testimonials, community engagement, and relationship marketing.'),
+]
+
+DISTRIBUTION_PENDING = 'Complete distribution configuration to get recommendation'
+
+# Promotion Mix activity cards shown per page
+PROMOTION_PAGE_SIZE = 12
+
+RULE_DEFAULTS = {
+    'strategy': '',
+    'pricing': '',
+    'promotion': '',
+    'distribution': DISTRIBUTION_PENDING,
+    'stage_advice': 'Consider your product lifecycle stage when allocating marketing budget.',
+    'type_advice': 'Tailor your communication mix to your product characteristics and target market.'
+}
+
+
+def _build_rules(cat):
+    catalog_rules = [
+        Rule('strategy', (('market_type', key),), market['strategy']) for key, market in cat.market_types.items()
+    ] + [
+        Rule('distribution', (('distribution', key),), f"{channel['name']} - {channel['description']}")
+        for key, channel in cat.distribution_channels.items()
+    ]
+    return RuleSet(catalog_rules + RULES, RULE_DEFAULTS, lists=('messaging',))
+
+
+def rules(cat=None):
+    """The compiled RuleSet for the live catalog."""
+    return (cat or catalog.current()).derived(_build_rules)
+
+
+class StateAxes:
+    """Axes of the canonical state encoding for one catalog version.
+
+    Only the inputs that can change the output are encoded; anything unknown
+    or unset maps to slot 0 (None). Forces and segments are encoded as a
+    bitmask over the (field, value) conditions the recommendation rules test.
+    """
+
+    def __init__(self, cat):
+        ruleset = cat.derived(_build_rules)
+        self.market = (None,) + tuple(cat.market_types)
+        self.stage = (None,) + tuple(PRODUCT_STAGES)
+        self.distribution = (None,) + tuple(cat.distribution_channels)
+        self.product_type = (None,) + tuple(cat.product_types)
+        self.market_index = {value: i for i, value in enumerate(self.market)}
+        self.stage_index = {value: i for i, value in enumerate(self.stage)}
+        self.distribution_index = {value: i for i, value in enumerate(self.distribution)}
+        self.product_type_index = {value: i for i, value in enumerate(self.product_type)}
+        self.force_tests = ruleset.tests('force.')
+        self.segment_tests = ruleset.tests('segment.')
+        self.force_masks = 1 << len(self.force_tests)
+        self.segment_masks = 1 << len(self.segment_tests)
+
+        # Facts each slot of each axis contributes, in encode_state() order
+        force_fields = dict.fromkeys(field for field, _ in self.force_tests)
+        segment_fields = dict.fromkeys(field for field, _ in self.segment_tests)
+        self.axis_facts = (
+            [{'market_type': value} for value in self.market],
+            [{'product_stage': value} for value in self.stage],
+            [{'distribution': value} for value in self.distribution],
+            [{'product_type': value} for value in self.product_type],
+            [self._mask_facts(force_fields, self.force_tests, mask) for mask in range(self.force_masks)],
+            [self._mask_facts(segment_fields, self.segment_tests, mask) for mask in range(self.segment_masks)],
+        )
+        self.axis_of = {field: axis for axis, facts in enumerate(self.axis_facts) for field in facts[0]}
+
+    @staticmethod
+    def _mask_facts(fields, tests, mask):
+        facts = dict.fromkeys(fields)
+        for bit, (field, value) in enumerate(tests):
+            if mask >> bit & 1:
+                facts[field] = value
+        return facts
+
+
+def distribution_key(config):
+    if not config or not config.get('customization') or not config.get('market_concentration'):
+        return None
+    return f"{config['customization']}-{config['market_concentration']}"
+
+
+def get_distribution_recommendation(config):
+    key = distribution_key(config)
+    if key is None:
+        return None
+    return catalog.current().distribution_channels.get(key)
+
+
+def force_mask(competitive_forces, axes=None):
+    axes = axes or catalog.current().derived(StateAxes)
+    mask = 0
+    for bit, (field, value) in enumerate(axes.force_tests):
+        if competitive_forces.get(field[len('force.'):]) == value:
+            mask |= 1 << bit
+    return mask
+
+
+def segment_mask(segmentation, axes=None):
+    axes = axes or catalog.current().derived(StateAxes)
+    mask = 0
+    for bit, (field, value) in enumerate(axes.segment_tests):
+        if (field[len('segment.'):] in segmentation) == value:
+            mask |= 1 << bit
+    return mask
+
+
+def encode_state(product_type=None, product_stage=None, market_type=None,
+                 segmentation=(), competitive_forces=None, distribution_config=None, axes=None):
+    """Map a wizard state to its slot in the recommendation index."""
+    axes = axes or catalog.current().derived(StateAxes)
+    key = axes.market_index.get(market_type, 0)
+    key = key * len(axes.stage) + axes.stage_index.get(product_stage, 0)
+    key = key * len(axes.distribution) + axes.distribution_index.get(distribution_key(distribution_config), 0)
+    key = key * len(axes.product_type) + axes.product_type_index.get(product_type, 0)
+    key = key * axes.force_masks + force_mask(competitive_forces or {}, axes)
+    key = key * axes.segment_masks + segment_mask(segmentation or (), axes)
+    return key
+
+
+def _build_recommendation_index(cat):
+    axes = cat.derived(StateAxes)
+    ruleset = cat.derived(_build_rules)
+    shape = tuple(len(facts) for facts in axes.axis_facts)
+    columns = []
+    for output in Recommendation._fields:
+        # Tabulate each output over only the axes its rules read, stepping an
+        # incremental evaluation so each step re-checks just the rules whose
+        # fields changed; then broadcast the table over the remaining axes.
+        unknown = [field for field in ruleset.depends_on(output) if field not in axes.axis_of]
+        if unknown:
+            raise ValueError(f"{output} rules read {unknown}, which are not part of the state encoding")
+        deps = sorted({axes.axis_of[field] for field in ruleset.depends_on(output)})
+        table = np.empty([shape[axis] for axis in deps], dtype=object)
+        evaluation = Evaluation(ruleset)
+        for slots in itertools.product(*(range(shape[axis]) for axis in deps)):
+            for axis, slot in zip(deps, slots):
+                evaluation.update(axes.axis_facts[axis][slot])
+            table[slots] = evaluation.values[output]
+        table = table.reshape([shape[axis] if axis in deps else 1 for axis in range(len(shape))])
+        columns.append(np.broadcast_to(table, shape).ravel().tolist())
+    return tuple(map(Recommendation, *columns))
+
+
+def prewarm(cat=None):
+    """Build the catalog-derived indexes ahead of first use."""
+    cat = cat or catalog.current()
+    cat.load_all()
+    for build in (_build_recommendation_index, _build_promotion_scorer, _build_budget_optimizer,
+                  _build_product_classifier):
+        cat.derived(build)
+
+
+def recommendation_index(cat=None):
+    """Every distinct Recommendation, ordered by encode_state(); built once per catalog version."""
+    return (cat or catalog.current()).derived(_build_recommendation_index)
+
+
+def get_recommendations(product_type=None, product_stage=None, market_type=None,
+                        segmentation=(), competitive_forces=None, distribution_config=None):
+    cat = catalog.current()
+    return recommendation_index(cat)[encode_state(
+        product_type, product_stage, market_type, segmentation, competitive_forces, distribution_config,
+        axes=cat.derived(StateAxes)
+    )]
+
+
+def _build_promotion_scorer(cat):
+    return PromotionScorer(cat.communication_tools)
+
+
+def promotion_scorer():
+    return catalog.current().derived(_build_promotion_scorer)
+
+
+def get_promotion_recommendations(target_audience, limit=PROMOTION_PAGE_SIZE):
+    return promotion_scorer().recommend(target_audience, limit)
+
+
+def get_promotion_page(target_audience, page=0, page_size=PROMOTION_PAGE_SIZE):
+    """(recommendations on one page of the full ranking, total recommendable tools)."""
+    return promotion_scorer().recommend_page(target_audience, page, page_size)
+
+
+def _build_budget_optimizer(cat):
+    return BudgetOptimizer(cat.communication_tools, cat.derived(_build_promotion_scorer))
+
+
+def allocate_budget(tools, total_budget, product_stage=None, target_audience=None):
+    return catalog.current().derived(_build_budget_optimizer).allocate(tools, total_budget, product_stage, target_audience)
+
+
+def simulation_model(tools, total_budget, product_stage=None, target_audience=None):
+    """MixModel for the budget-optimal split of a mix, weighted by stage and audience fit."""
+    cat = catalog.current()
+    optimizer = cat.derived(_build_budget_optimizer)
+    scorer = cat.derived(_build_promotion_scorer)
+    allocation = optimizer.allocate(tools, total_budget, product_stage, target_audience)
+    idx = [optimizer.index[tool] for tool in tools]
+    mode = audience_mode(target_audience)
+    fit_scores = scorer.scores[mode, idx] if mode is not None else [1] * len(idx)
+    stage_weights = optimizer.stage_weights[product_stage][idx] if product_stage in optimizer.stage_weights else [1.0] * len(idx)
+    return build_model(tools, allocation.spend, allocation.response, fit_scores, stage_weights)
+
+
+def get_stage_advice(stage):
+    return rules().evaluate('stage_advice', {'product_stage': stage})
+
+
+def _build_product_classifier(cat):
+    return ProductClassifier(cat.product_keywords)
+
+
+def classify_product_type(product_type):
+    """Ranked ((category, confidence), ...) for free-text product type input."""
+    if not product_type:
+        return ()
+    return catalog.current().derived(_build_product_classifier).classify(product_type)
+
+
+def get_type_advice(product_type):
+    ruleset = rules()
+    for category, _ in classify_product_type(product_type):
+        advice = ruleset.evaluate('type_advice', {'product_category': category})
+        if advice != ruleset.defaults['type_advice']:
+            return advice
+    return ruleset.defaults['type_advice']
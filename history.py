@@ -0,0 +1,176 @@
+# history.py - SQLite plan history: pooled connections, keyset pagination, incremental aggregates
+import json
+import os
+import queue
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(os.environ.get('MARKETING_HISTORY_DB', Path(__file__).resolve().parent / 'history.db'))
+DEFAULT_POOL_SIZE = 4
+PAGE_SIZE = 20
+
+# Columns plans can be filtered on; each has an index ending in id so a
+# filtered, newest-first page is a single index range scan
+FILTER_COLUMNS = ('product_type', 'product_stage', 'market_type', 'selected_channel')
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS plans (
+        id INTEGER PRIMARY KEY,
+        created_at REAL NOT NULL,
+        session_id TEXT,
+        token TEXT NOT NULL,
+        product_type TEXT,
+        product_stage TEXT,
+        market_type TEXT,
+        selected_channel TEXT,
+        strategy TEXT,
+        activities TEXT NOT NULL
+    )''',
+    *(f'CREATE INDEX IF NOT EXISTS plans_{column} ON plans ({column}, id)' for column in FILTER_COLUMNS),
+    # Materialized counts per (product type, stage), updated with every save
+    '''CREATE TABLE IF NOT EXISTS plan_stats (
+        product_type TEXT NOT NULL,
+        product_stage TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (product_type, product_stage, dimension, value)
+    ) WITHOUT ROWID''',
+]
+
+# plan_stats dimensions: 'plans' (value ''), 'market_type' (MARKET_TYPES key),
+# 'channel' (DISTRIBUTION_CHANNELS key), 'tool' (COMMUNICATION_TOOLS name)
+# and 'force:<force>' (level)
+STATS_UPSERT = (
+    'INSERT INTO plan_stats (product_type, product_stage, dimension, value, count) VALUES (?, ?, ?, ?, 1) '
+    'ON CONFLICT (product_type, product_stage, dimension, value) DO UPDATE SET count = count + 1'
+)
+
+
+def stat_keys(plan):
+    """(dimension, value) pairs a plan adds one to."""
+    keys = [('plans', '')]
+    if plan.get('market_type'):
+        keys.append(('market_type', plan['market_type']))
+    if plan.get('channel'):
+        keys.append(('channel', plan['channel']))
+    keys.extend(('force:' + force, level) for force, level in (plan.get('forces') or {}).items())
+    keys.extend(('tool', tool) for tool in plan.get('activities', []))
+    return keys
+
+
+class ConnectionPool:
+    """Fixed set of SQLite connections handed out one caller at a time."""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE):
+        self.path = Path(path)
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+
+class PlanStore:
+    """Saved Step 6 plans and promotion mixes, browsable newest first."""
+
+    def __init__(self, path=DEFAULT_DB_PATH, pool_size=DEFAULT_POOL_SIZE):
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn, conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def save(self, token, plan, session_id=None):
+        """Store a plan and return its id.
+
+        ``plan`` holds product_type, product_stage, market_type,
+        selected_channel, strategy and activities (a list of tool names),
+        plus channel and forces for the aggregates.
+        """
+        group = (plan.get('product_type') or '', plan.get('product_stage') or '')
+        with self.pool.connection() as conn, conn:
+            conn.executemany(STATS_UPSERT, [group + key for key in stat_keys(plan)])
+            cursor = conn.execute(
+                'INSERT INTO plans (created_at, session_id, token, product_type, product_stage, market_type, '
+                'selected_channel, strategy, activities) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (time.time(), session_id, token, plan.get('product_type') or None, plan.get('product_stage') or None,
+                 plan.get('market_type') or None, plan.get('selected_channel') or None,
+                 plan.get('strategy') or None, json.dumps(plan.get('activities', [])))
+            )
+            return cursor.lastrowid
+
+    def page(self, filters=None, before=None, limit=PAGE_SIZE):
+        """Return (rows, next_cursor) for plans older than id ``before``.
+
+        ``filters`` maps FILTER_COLUMNS to exact values. ``next_cursor`` is
+        passed back as ``before`` for the following page, or None at the end.
+        """
+        clauses, params = [], []
+        for column, value in (filters or {}).items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"cannot filter on {column!r}")
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if before is not None:
+            clauses.append('id < ?')
+            params.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f'SELECT * FROM plans {where} ORDER BY id DESC LIMIT ?', (*params, limit + 1)
+            ).fetchall()
+        rows = [{**dict(row), 'activities': json.loads(row['activities'])} for row in rows]
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1]['id']
+        return rows, None
+
+    def distinct(self, column):
+        """Values present in a filter column, for filter dropdowns."""
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"cannot filter on {column!r}")
+        with self.pool.connection() as conn:
+            # Skip-scan over the column's index rather than reading the table
+            values, last = [], None
+            while True:
+                row = conn.execute(
+                    f'SELECT {column} FROM plans WHERE {column} > ? ORDER BY {column} LIMIT 1'
+                    if last is not None else
+                    f'SELECT {column} FROM plans WHERE {column} IS NOT NULL ORDER BY {column} LIMIT 1',
+                    (last,) if last is not None else ()
+                ).fetchone()
+                if row is None:
+                    return values
+                last = row[0]
+                values.append(last)
+
+    def stats(self, product_type=None, product_stage=None):
+        """Aggregated counts as {dimension: {value: count}}, optionally for one product type and/or stage."""
+        clauses, params = [], []
+        if product_type:
+            clauses.append('product_type = ?')
+            params.append(product_type)
+        if product_stage:
+            clauses.append('product_stage = ?')
+            params.append(product_stage)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f'SELECT dimension, value, SUM(count) FROM plan_stats {where} GROUP BY dimension, value', params
+            ).fetchall()
+        stats = {}
+        for dimension, value, count in rows:
+            stats.setdefault(dimension, {})[value] = count
+        return stats
@@ -0,0 +1,123 @@
+# leads.py - Bounded in-process queue of WhatsApp bookings, flushed to SQLite in batches
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import metrics
+
+DEFAULT_DB_PATH = Path(os.environ.get('MARKETING_LEADS_DB', Path(__file__).resolve().parent / 'leads.db'))
+DEFAULT_MAX_QUEUE = 1000
+BATCH_SIZE = 200
+# Longest a queued lead waits before its batch is written
+FLUSH_INTERVAL = 1.0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    session_id TEXT,
+    product_type TEXT,
+    product_stage TEXT,
+    recommended_channel TEXT,
+    channel_model TEXT,
+    selected_channel TEXT
+)
+'''
+
+
+class LeadEvent(NamedTuple):
+    created_at: float
+    source: str  # which button: 'channel_setup' or 'final_contact'
+    session_id: Optional[str]
+    product_type: Optional[str]
+    product_stage: Optional[str]
+    recommended_channel: Optional[str]
+    channel_model: Optional[str]
+    selected_channel: Optional[str]
+
+
+class LeadQueue:
+    """Accepts lead events without blocking and writes them from a background thread.
+
+    When the queue is full, new events are dropped and counted rather than
+    slowing down the caller. Queue depth, drops and write batches are reported
+    through the metrics registry.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, maxsize=DEFAULT_MAX_QUEUE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, registry=metrics.REGISTRY):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.registry = registry
+        self._queue = queue.Queue(maxsize)
+        self._stopping = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='lead-writer', daemon=True)
+        self._worker.start()
+
+    def submit(self, event):
+        """Enqueue an event; returns False if it was dropped because the queue is full."""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.registry.inc('leads_dropped')
+            return False
+        self.registry.inc('leads_enqueued')
+        self.registry.set_gauge('lead_queue_depth', self._queue.qsize())
+        return True
+
+    def _next_batch(self, batch):
+        # Block for the first event, then take whatever else arrives within the flush window
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                if batch or self._stopping.is_set():
+                    break
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _write(self, db, batch):
+        with self.registry.timer('lead_flush'), db:
+            db.executemany(
+                f"INSERT INTO leads ({', '.join(LeadEvent._fields)}) VALUES ({', '.join('?' * len(LeadEvent._fields))})",
+                batch
+            )
+
+    def _run(self):
+        db = sqlite3.connect(self.db_path)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute(SCHEMA)
+        batch = []
+        while not (self._stopping.is_set() and not batch and self._queue.empty()):
+            batch = self._next_batch(batch)
+            self.registry.set_gauge('lead_queue_depth', self._queue.qsize())
+            if not batch:
+                continue
+            try:
+                self._write(db, batch)
+            except sqlite3.Error:
+                # Keep the batch and retry; meanwhile the bounded queue sheds load
+                self.registry.inc('lead_write_errors')
+                if self._stopping.wait(self.flush_interval):
+                    break
+                continue
+            self.registry.inc('leads_written', len(batch))
+            batch = []
+        db.close()
+
+    def close(self, timeout=5.0):
+        """Flush queued events and stop the writer."""
+        self._stopping.set()
+        self._worker.join(timeout)
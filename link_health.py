@@ -0,0 +1,175 @@
+# link_health.py - Concurrent design-resource link checks with a TTL cache
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import catalog
+import metrics
+
+# Seconds a check result stays fresh
+DEFAULT_TTL = 6 * 60 * 60
+# Concurrent requests and minimum seconds between request starts, per host
+PER_HOST_CONCURRENCY = 2
+PER_HOST_INTERVAL = 0.25
+REQUEST_TIMEOUT = 10.0
+USER_AGENT = 'marketing-strategy-tool link checker'
+
+
+class LinkHealth(NamedTuple):
+    status: str  # 'ok', 'broken' (HTTP error) or 'unreachable'
+    code: Optional[int]
+    checked_at: float
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+
+    def stale(self, keys):
+        """Keys that are missing or expired."""
+        now = self._clock()
+        with self._lock:
+            return [key for key in keys if key not in self._entries or self._entries[key][0] <= now]
+
+
+class HostLimiter:
+    """Caps concurrency and spaces out request starts per host. Use from one event loop."""
+
+    def __init__(self, concurrency=PER_HOST_CONCURRENCY, interval=PER_HOST_INTERVAL):
+        self.concurrency = concurrency
+        self.interval = interval
+        self._semaphores = {}
+        self._next_start = {}
+
+    async def __call__(self, host, request):
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            start = max(loop.time(), self._next_start.get(host, 0.0))
+            self._next_start[host] = start + self.interval
+            await asyncio.sleep(start - loop.time())
+            return await request()
+
+
+def default_pool(max_hosts=32):
+    # urllib3 is imported on first check rather than with the app, which
+    # imports this module on every cold start
+    import urllib3
+    return urllib3.PoolManager(
+        num_pools=max_hosts,
+        maxsize=PER_HOST_CONCURRENCY,
+        headers={'User-Agent': USER_AGENT},
+        timeout=urllib3.Timeout(total=REQUEST_TIMEOUT),
+        retries=urllib3.Retry(total=2, redirect=5, backoff_factor=0.5, raise_on_status=False),
+    )
+
+
+def _probe(http, url):
+    # Many sites reject HEAD; fall back to a GET without reading the body
+    response = http.request('HEAD', url)
+    if response.status >= 400:
+        response = http.request('GET', url, preload_content=False)
+        response.release_conn()
+    return response.status
+
+
+async def check_urls(urls, http=None, limiter=None):
+    """Check every URL concurrently; return {url: LinkHealth}."""
+    import urllib3
+    http = http or default_pool()
+    limiter = limiter or HostLimiter()
+
+    async def check(url):
+        try:
+            code = await limiter(urlsplit(url).netloc, lambda: asyncio.to_thread(_probe, http, url))
+        except (urllib3.exceptions.HTTPError, ValueError):
+            health = LinkHealth('unreachable', None, time.time())
+        else:
+            health = LinkHealth('ok' if code < 400 else 'broken', code, time.time())
+        metrics.REGISTRY.inc(f"link_checks_{health.status}")
+        return url, health
+
+    return dict(await asyncio.gather(*(check(url) for url in dict.fromkeys(urls))))
+
+
+def catalog_urls(cat=None):
+    tools = (cat or catalog.current()).communication_tools
+    return list(dict.fromkeys(resource['url'] for details in tools.values() for resource in details['resources']))
+
+
+class LinkMonitor:
+    """Runs checks on a background event loop and serves cached results without blocking."""
+
+    def __init__(self, ttl=DEFAULT_TTL, http=None, limiter=None):
+        self.cache = TTLCache(ttl)
+        self.http = http or default_pool()
+        self.limiter = limiter
+        self._loop = asyncio.new_event_loop()
+        self._pending = set()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._loop.run_forever, name='link-health', daemon=True).start()
+
+    async def _run(self, urls):
+        if self.limiter is None:
+            self.limiter = HostLimiter()
+        try:
+            for url, health in (await check_urls(urls, self.http, self.limiter)).items():
+                self.cache.put(url, health)
+        finally:
+            with self._lock:
+                self._pending.difference_update(urls)
+
+    def refresh(self, urls):
+        """Schedule checks for URLs that are stale and not already being checked."""
+        with self._lock:
+            urls = [url for url in self.cache.stale(urls) if url not in self._pending]
+            self._pending.update(urls)
+        if urls:
+            return asyncio.run_coroutine_threadsafe(self._run(urls), self._loop)
+        return None
+
+    def status(self, url):
+        """Cached LinkHealth for ``url``, or None if not checked (yet)."""
+        return self.cache.get(url)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check design resource links.')
+    parser.add_argument('urls', nargs='*', help='URLs to check (default: every catalog resource)')
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(check_urls(args.urls or catalog_urls()))
+    failures = 0
+    for url, health in results.items():
+        failures += health.status != 'ok'
+        print(f"{health.status:<12} {health.code or '-':>4} {url}")
+    print(f"{len(results) - failures}/{len(results)} links OK", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
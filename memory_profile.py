@@ -0,0 +1,172 @@
+# memory_profile.py - Opt-in tracemalloc rerun profiler that flags memory growing across reruns
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import NamedTuple
+
+import metrics
+
+# Reruns in a row a key or line must grow for before it is flagged
+DEFAULT_WINDOW = 5
+# Net bytes a line must allocate in a rerun to count towards its streak
+MIN_LINE_GROWTH = 1024
+DEFAULT_TOP = 10
+# Sessions tracked at once; the least recently profiled is dropped beyond this
+MAX_SESSIONS = 100
+TRACEBACK_FRAMES = 1
+
+# Allocations made by the profiler and the import system are not the app's
+IGNORED_FILES = frozenset((tracemalloc.__file__, __file__, '<frozen importlib._bootstrap>',
+                           '<frozen importlib._bootstrap_external>', '<unknown>'))
+
+
+class LineGrowth(NamedTuple):
+    line: str        # 'path:lineno'
+    size_diff: int   # change in bytes held by allocations from this line over the rerun
+    count_diff: int  # change in blocks
+    streak: int      # consecutive reruns this line grew by at least MIN_LINE_GROWTH
+
+
+class RerunReport(NamedTuple):
+    session_id: str
+    rerun: int
+    traced: int         # bytes traced since profiling of this session began
+    peak: int           # highest traced bytes during the rerun
+    state_sizes: dict   # session_state key -> approximate deep size in bytes
+    top_lines: tuple    # LineGrowth, largest net allocation first
+    growing_keys: tuple  # keys whose size grew on each of the last ``window`` reruns
+    growing_lines: tuple  # LineGrowth with streak >= window
+    scope: str = 'script'  # 'script' for a full rerun, else the rerun fragment's name
+
+
+def deep_size(value, seen=None):
+    """Approximate bytes held by ``value`` and everything reachable through containers and attributes."""
+    seen = set() if seen is None else seen
+    if id(value) in seen or isinstance(value, type):
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(item, seen) for item in value)
+    elif hasattr(value, '__dict__'):
+        size += deep_size(vars(value), seen)
+    return size
+
+
+class _SessionHistory:
+    def __init__(self, window):
+        self.reruns = 0
+        self.started = False
+        self.line_totals = None
+        self.key_sizes = {}
+        self.line_streaks = {}
+        self.window = window
+
+    def growing_keys(self, sizes):
+        for key, size in sizes.items():
+            self.key_sizes.setdefault(key, deque(maxlen=self.window + 1)).append(size)
+        for key in set(self.key_sizes) - set(sizes):
+            del self.key_sizes[key]
+        return tuple(
+            key for key, history in self.key_sizes.items()
+            if len(history) > self.window and all(a < b for a, b in zip(history, list(history)[1:]))
+        )
+
+
+class MemoryProfiler:
+    """Compares what each line holds at the end of consecutive reruns, per session.
+
+    A rerun is either a full script run or a fragment's own rerun; both
+    count towards the growth streaks.
+
+    Traces are cleared when profiling of a session starts, so snapshots
+    only hold what was allocated since and stay cheap unless memory really
+    is growing. tracemalloc is process-wide: profile with one active
+    session, since another session starting clears the traces and its
+    reruns add to them. ``log_path`` appends one JSON line per rerun.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, top=DEFAULT_TOP, log_path=None, registry=metrics.REGISTRY):
+        self.window = window
+        self.top = top
+        self.log_path = log_path
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._sessions = {}
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+
+    def begin(self, session_id):
+        """Call at the top of a full or fragment rerun."""
+        with self._lock:
+            history = self._sessions.pop(session_id, None) or _SessionHistory(self.window)
+            self._sessions[session_id] = history
+            if len(self._sessions) > MAX_SESSIONS:
+                del self._sessions[next(iter(self._sessions))]
+        if history.line_totals is None:
+            tracemalloc.clear_traces()
+            history.line_totals = {}
+        tracemalloc.reset_peak()
+        history.started = True
+
+    def end(self, session_id, state, scope='script'):
+        """Call at the end of the rerun with the session's state items; returns a RerunReport."""
+        with self._lock:
+            history = self._sessions.get(session_id)
+        if history is None or not history.started:
+            return None
+        traced, peak = tracemalloc.get_traced_memory()
+        totals = {}
+        for stat in tracemalloc.take_snapshot().statistics('lineno'):
+            frame = stat.traceback[0]
+            if frame.filename not in IGNORED_FILES:
+                totals[f'{frame.filename}:{frame.lineno}'] = (stat.size, stat.count)
+        history.started = False
+        history.reruns += 1
+
+        ranked, streaks = [], {}
+        previous = history.line_totals
+        for line in totals.keys() | previous.keys():
+            size, count = totals.get(line, (0, 0))
+            old_size, old_count = previous.get(line, (0, 0))
+            if size - old_size >= MIN_LINE_GROWTH:
+                streaks[line] = history.line_streaks.get(line, 0) + 1
+            if size != old_size or count != old_count:
+                ranked.append(LineGrowth(line, size - old_size, count - old_count, streaks.get(line, 0)))
+        ranked.sort(key=lambda growth: growth.size_diff, reverse=True)
+        history.line_totals = totals
+        history.line_streaks = streaks
+
+        sizes = {str(key): deep_size(value) for key, value in state}
+        report = RerunReport(
+            session_id,
+            history.reruns,
+            traced,
+            peak,
+            sizes,
+            tuple(ranked[:self.top]),
+            history.growing_keys(sizes),
+            tuple(growth for growth in ranked if growth.streak >= self.window)[:self.top],
+            scope,
+        )
+        self.registry.set_gauge('traced_memory_bytes', traced)
+        if report.growing_keys or report.growing_lines:
+            self.registry.inc('memory_growth_flags')
+        if self.log_path:
+            self._log(report)
+        return report
+
+    def _log(self, report):
+        record = {
+            'time': time.time(),
+            **report._asdict(),
+            'top_lines': [line._asdict() for line in report.top_lines],
+            'growing_lines': [line._asdict() for line in report.growing_lines],
+        }
+        with self._lock, open(self.log_path, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(record) + '\n')
@@ -0,0 +1,168 @@
+# metrics.py - In-process render timing histograms with Prometheus/JSON export
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram upper bounds in seconds (+Inf is implicit)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# A session counts as active if it reran within this many seconds
+ACTIVE_SESSION_WINDOW = 300
+
+PREFIX = 'marketing'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Thread-safe section timings, counters and gauges, including active sessions."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, session_window=ACTIVE_SESSION_WINDOW):
+        self.buckets = tuple(buckets)
+        self.session_window = session_window
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._sessions = {}
+
+    def observe(self, section, seconds):
+        with self._lock:
+            histogram = self._histograms.get(section)
+            if histogram is None:
+                histogram = self._histograms[section] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, section):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(section, time.perf_counter() - start)
+
+    def inc(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def set_gauge(self, gauge, value):
+        with self._lock:
+            self._gauges[gauge] = value
+
+    def record_rerun(self, session_id=None):
+        """Count a full or fragment rerun and mark its session active."""
+        now = time.monotonic()
+        with self._lock:
+            self._counters['reruns'] = self._counters.get('reruns', 0) + 1
+            if session_id is not None:
+                # Re-insert so the dict stays ordered by last rerun
+                self._sessions.pop(session_id, None)
+                self._sessions[session_id] = now
+            self._prune_sessions(now)
+
+    def _prune_sessions(self, now):
+        # Oldest first, so only the expired sessions are visited
+        cutoff = now - self.session_window
+        while self._sessions:
+            session_id, seen = next(iter(self._sessions.items()))
+            if seen >= cutoff:
+                break
+            del self._sessions[session_id]
+
+    def active_sessions(self):
+        with self._lock:
+            self._prune_sessions(time.monotonic())
+            return len(self._sessions)
+
+    def snapshot(self):
+        active = self.active_sessions()
+        with self._lock:
+            sections = {
+                name: {
+                    'count': h.count,
+                    'sum_seconds': h.sum,
+                    'mean_ms': h.sum / h.count * 1000 if h.count else 0.0,
+                    'buckets': {('+Inf' if bound == float('inf') else str(bound)): total for bound, total in h.cumulative()}
+                }
+                for name, h in sorted(self._histograms.items())
+            }
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        return {'active_sessions': active, 'counters': counters, 'gauges': gauges, 'sections': sections}
+
+    def prometheus_text(self):
+        active = self.active_sessions()
+        lines = [
+            f'# HELP {PREFIX}_section_duration_seconds Time spent rendering app sections.',
+            f'# TYPE {PREFIX}_section_duration_seconds histogram'
+        ]
+        with self._lock:
+            for name, h in sorted(self._histograms.items()):
+                for bound, total in h.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{PREFIX}_section_duration_seconds_bucket{{section="{name}",le="{le}"}} {total}')
+                lines.append(f'{PREFIX}_section_duration_seconds_sum{{section="{name}"}} {h.sum}')
+                lines.append(f'{PREFIX}_section_duration_seconds_count{{section="{name}"}} {h.count}')
+            for name, value in sorted(self._counters.items()):
+                lines.append(f'# TYPE {PREFIX}_{name}_total counter')
+                lines.append(f'{PREFIX}_{name}_total {value}')
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f'# TYPE {PREFIX}_{name} gauge')
+                lines.append(f'{PREFIX}_{name} {value}')
+        lines.append(f'# HELP {PREFIX}_active_sessions Sessions that reran in the last {self.session_window}s.')
+        lines.append(f'# TYPE {PREFIX}_active_sessions gauge')
+        lines.append(f'{PREFIX}_active_sessions {active}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+timer = REGISTRY.timer
+
+
+def serve(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.prometheus_text(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(registry.snapshot()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,208 @@
+# pdf_export.py - Background PDF reports with a content-addressed LRU disk cache
+import hashlib
+import json
+import os
+import tempfile
+import textwrap
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Bump when the report layout changes so stale cached files are not served
+REPORT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / 'marketing-reports'
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# Failed renders remembered for reporting; the oldest is dropped beyond this
+MAX_FAILED = 100
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+STYLES = {
+    'title': ('F2', 16, 24),
+    'heading': ('F2', 12, 20),
+    'text': ('F1', 10, 14),
+}
+WRAP_WIDTH = 95
+
+
+def plan_key(plan):
+    """Content hash of a canonical (JSON-serializable) report plan."""
+    canonical = json.dumps([REPORT_VERSION, plan], sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def build_report(plan):
+    """Lay out a plan as (style, text) lines."""
+    recommendations = plan['recommendations']
+    lines = [('title', 'Marketing Strategy & Promotion Mix Report')]
+    lines.append(('text', f"Product Type: {plan.get('product_type') or 'N/A'}"))
+    lines.append(('text', f"Product Stage: {plan.get('product_stage') or 'N/A'}"))
+    lines.append(('text', f"Target Audience: {plan.get('target_audience') or 'N/A'}"))
+
+    lines.append(('heading', f"Core Strategy: {recommendations['strategy'] or 'N/A'}"))
+    for title, field in (('Promotion Strategy', 'promotion'), ('Pricing Strategy', 'pricing'),
+                         ('Distribution Strategy', 'distribution')):
+        lines.append(('heading', title))
+        lines.append(('text', recommendations[field] or 'N/A'))
+    if plan.get('selected_channel'):
+        lines.append(('text', f"Selected Channel: {plan['selected_channel']}"))
+
+    if recommendations['messaging']:
+        lines.append(('heading', 'Key Messaging Insights'))
+        lines.extend(('text', f"- {msg}") for msg in recommendations['messaging'])
+
+    if plan.get('activities'):
+        lines.append(('heading', 'Selected Promotion Mix'))
+        for i, activity in enumerate(plan['activities'], 1):
+            lines.append(('text', f"{i}. {activity['tool']} ({activity['type'].replace('-', ' ').title()})"))
+            for resource in activity['resources']:
+                lines.append(('text', f"    {resource['name']} - {resource['desc']}: {resource['url']}"))
+    return lines
+
+
+def _pdf_string(text):
+    raw = text.encode('cp1252', errors='replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def render_pdf(lines):
+    """Render (style, text) lines to a minimal multi-page PDF using base fonts."""
+    pages, stream, y = [], [], PAGE_HEIGHT - MARGIN
+    for style, text in lines:
+        font, size, leading = STYLES[style]
+        for part in textwrap.wrap(text, WRAP_WIDTH, subsequent_indent='  ') or ['']:
+            if y - leading < MARGIN:
+                pages.append(stream)
+                stream, y = [], PAGE_HEIGHT - MARGIN
+            y -= leading
+            stream.append(b'BT /%s %d Tf %d %d Td %s Tj ET' % (font.encode(), size, MARGIN, y, _pdf_string(part)))
+    pages.append(stream)
+
+    # Objects: 1 catalog, 2 page tree, 3-4 fonts, then a (page, content) pair per page
+    objects = [None, None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>']
+    page_ids = []
+    for stream in pages:
+        content = b'\n'.join(stream)
+        page_ids.append(len(objects) + 1)
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+                       b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>'
+                       % (PAGE_WIDTH, PAGE_HEIGHT, len(objects) + 2))
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content))
+    objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % i for i in page_ids), len(page_ids))
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class ReportCache:
+    """PDF files on disk named by content hash, evicted least-recently-used past a byte cap."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # key -> size, oldest first; seeded from what earlier processes left behind
+        self._entries = OrderedDict()
+        existing = sorted(self.directory.glob('*.pdf'), key=lambda p: p.stat().st_mtime)
+        for path in existing:
+            self._entries[path.stem] = path.stat().st_size
+        self._total = sum(self._entries.values())
+
+    def path(self, key):
+        return self.directory / f'{key}.pdf'
+
+    def get(self, key):
+        """The cached PDF's bytes, or None. Read under the lock, so a concurrent put can't evict it mid-read."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self.path(key)
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+            except FileNotFoundError:
+                # Removed behind our back: treat it as a miss
+                self._total -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        path = self.path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old_key, size = self._entries.popitem(last=False)
+                self._total -= size
+                self.path(old_key).unlink(missing_ok=True)
+        return path
+
+
+class ReportExporter:
+    """Renders reports on a thread pool; concurrent requests for one plan share a job."""
+
+    def __init__(self, cache=None, max_workers=2):
+        self.cache = cache or ReportCache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pdf-export')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        # key -> error message, kept so every status() call can report it
+        self._failed = OrderedDict()
+
+    def _render(self, key, plan):
+        return self.cache.put(key, render_pdf(build_report(plan)))
+
+    def request(self, plan):
+        """Start rendering a plan unless it is cached or already in flight; return its key.
+
+        Requesting a plan whose render failed retries it.
+        """
+        key = plan_key(plan)
+        if self.cache.get(key) is not None:
+            return key
+        with self._lock:
+            self._failed.pop(key, None)
+            if key not in self._jobs:
+                self._jobs[key] = self._pool.submit(self._render, key, plan)
+        return key
+
+    def status(self, key):
+        """Return ('ready', pdf bytes), ('pending', None), ('failed', message) or ('missing', None) without blocking.
+
+        'missing' means the report is not cached (e.g. it was evicted); request it again to re-render.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.done():
+                del self._jobs[key]
+                if job.exception() is not None:
+                    self._failed[key] = str(job.exception())
+                    while len(self._failed) > MAX_FAILED:
+                        self._failed.popitem(last=False)
+            failure = self._failed.get(key)
+        if job is not None and not job.done():
+            return 'pending', None
+        if failure is not None:
+            return 'failed', failure
+        data = self.cache.get(key)
+        return ('ready', data) if data is not None else ('missing', None)
@@ -0,0 +1,214 @@
+# plan_state.py - Compact integer encodings for per-session wizard state
+import base64
+
+import catalog
+from catalog import AUDIENCE_OPTIONS, COMPETITIVE_FORCES, FORCE_LEVELS, PRODUCT_STAGES
+
+APP_MODES = ['Marketing Strategy', 'Promotion Mix']
+
+
+class Bitmask:
+    """Set of catalog entries stored as an int, one bit per entry's stable id.
+
+    Bits of ids no longer in the catalog are ignored, so a mask made before
+    an entry was removed still names the same entries.
+    """
+
+    def __init__(self, entries):
+        self.keys = tuple(entries)
+        self.bits = {key: 1 << entry['id'] for key, entry in entries.items()}
+        self.valid = sum(self.bits.values())
+
+    def contains(self, mask, key):
+        return bool(mask & self.bits.get(key, 0))
+
+    def add(self, mask, key):
+        return mask | self.bits[key]
+
+    def remove(self, mask, key):
+        return mask & ~self.bits[key]
+
+    def toggle(self, mask, key):
+        return mask ^ self.bits[key]
+
+    def assign(self, mask, key, present):
+        return self.add(mask, key) if present else self.remove(mask, key)
+
+    def count(self, mask):
+        return bin(mask & self.valid).count('1')
+
+    def members(self, mask):
+        return [key for key in self.keys if mask & self.bits[key]]
+
+    def from_keys(self, keys):
+        mask = 0
+        for key in keys:
+            mask |= self.bits.get(key, 0)
+        return mask
+
+
+class ForceLevels:
+    """Porter force ratings packed into one int.
+
+    The low digits hold each force's level in base 3; a bitmask of which
+    forces have been rated sits above them, so unrated forces stay distinct
+    from 'Low'.
+    """
+
+    def __init__(self, forces, levels):
+        self.forces = tuple(forces)
+        self.levels = tuple(levels)
+        self.base = len(self.levels)
+        self.span = self.base ** len(self.forces)
+        self._place = {force: self.base ** i for i, force in enumerate(self.forces)}
+        self._rated_bit = {force: 1 << i for i, force in enumerate(self.forces)}
+        self._level_index = {level: i for i, level in enumerate(self.levels)}
+        self._complete = (1 << len(self.forces)) - 1
+
+    def get(self, code, force):
+        if not code // self.span & self._rated_bit[force]:
+            return None
+        return self.levels[code // self._place[force] % self.base]
+
+    def set(self, code, force, level):
+        rated, digits = divmod(code, self.span)
+        place = self._place[force]
+        digits += (self._level_index[level] - digits // place % self.base) * place
+        return (rated | self._rated_bit[force]) * self.span + digits
+
+    def rated_count(self, code):
+        return bin(code // self.span).count('1')
+
+    def is_complete(self, code):
+        return code // self.span == self._complete
+
+    def to_dict(self, code):
+        return {force: self.get(code, force) for force in self.forces if code // self.span & self._rated_bit[force]}
+
+    def from_dict(self, ratings):
+        code = 0
+        for force, level in ratings.items():
+            code = self.set(code, force, level)
+        return code
+
+
+FORCES = ForceLevels([key for key, _ in COMPETITIVE_FORCES], FORCE_LEVELS)
+
+
+def _segments(cat):
+    return Bitmask(cat.segmentation_options)
+
+
+def _activities(cat):
+    return Bitmask(cat.communication_tools)
+
+
+def __getattr__(name):
+    # SEGMENTS and ACTIVITIES follow the live catalog version
+    if name == 'SEGMENTS':
+        return catalog.current().derived(_segments)
+    if name == 'ACTIVITIES':
+        return catalog.current().derived(_activities)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Shareable plan tokens. The whole plan is one integer of fixed-width bit
+# fields, with the activity mask (which grows with the catalog) on top.
+# Product types, markets, segments and activities are stored by their stable
+# catalog id, so tokens stay valid as entries are added, moved or removed;
+# bump PLAN_VERSION whenever a field or its width changes.
+PLAN_VERSION = 'p2'
+
+SEGMENT_BITS = catalog.STABLE_IDS['SEGMENTATION_OPTIONS']
+FORCE_BITS = (FORCES.span << len(FORCES.forces)).bit_length()
+
+
+def _choices(options):
+    return dict(enumerate(options))
+
+
+def _stable_choices(entries):
+    # Digit 0 is unset, so an entry's digit is its id + 1
+    return {0: None, **{entry['id'] + 1: key for key, entry in entries.items()}}
+
+
+class _PlanCodec:
+    def __init__(self, cat):
+        channel_options = tuple(dict.fromkeys(
+            example for channel in cat.distribution_channels.values() for example in channel['examples']
+        ))
+        # (name, bits, {digit: choice})
+        self.fields = (
+            ('app_mode', 1, _choices(APP_MODES)),
+            ('step', 3, _choices((1, 2, 3, 4, 5, 6))),
+            ('product_type', 6, _stable_choices(cat.product_types)),
+            ('product_stage', 3, _choices((None,) + tuple(PRODUCT_STAGES))),
+            ('market_type', 4, _stable_choices(cat.market_types)),
+            ('customization', 2, _choices((None, 'high', 'low'))),
+            ('market_concentration', 2, _choices((None, 'concentrated', 'fragmented'))),
+            ('selected_channel', 8, _choices((None,) + channel_options)),
+            ('target_audience', 2, _choices((None,) + tuple(AUDIENCE_OPTIONS))),
+        )
+        # Choices past a field's capacity encode as unset
+        self.index = {
+            name: {choice: digit for digit, choice in choices.items() if digit < 1 << bits}
+            for name, bits, choices in self.fields
+        }
+        self.activities = cat.derived(_activities)
+        self.segments = cat.derived(_segments)
+
+
+def encode_plan(state):
+    """Serialize the wizard fields of a session state mapping to a URL-safe token."""
+    codec = catalog.current().derived(_PlanCodec)
+    config = state.get('distribution_config') or {}
+    fields = {**state, 'customization': config.get('customization'),
+              'market_concentration': config.get('market_concentration')}
+    value = state.get('activity_mask', 0)
+    for name, bits, _ in codec.fields:
+        value = value << bits | codec.index[name].get(fields.get(name) or None, 0)
+    value = value << SEGMENT_BITS | state.get('segment_mask', 0)
+    value = value << FORCE_BITS | state.get('forces_code', 0)
+    payload = value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big')
+    return PLAN_VERSION + base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_plan(token):
+    """Inverse of encode_plan(); returns None for missing, stale or malformed tokens."""
+    if not token or not token.startswith(PLAN_VERSION):
+        return None
+    payload = token[len(PLAN_VERSION):]
+    try:
+        padded = payload + '=' * (-len(payload) % 4)
+        value = int.from_bytes(base64.b64decode(padded, altchars=b'-_', validate=True), 'big')
+    except ValueError:
+        return None
+    codec = catalog.current().derived(_PlanCodec)
+    forces_code = value & ((1 << FORCE_BITS) - 1)
+    value >>= FORCE_BITS
+    segment_mask = value & ((1 << SEGMENT_BITS) - 1)
+    value >>= SEGMENT_BITS
+    fields = {}
+    for name, bits, choices in reversed(codec.fields):
+        digit = value & ((1 << bits) - 1)
+        value >>= bits
+        fields[name] = choices.get(digit, choices[0])
+    if forces_code >= FORCES.span << len(FORCES.forces):
+        forces_code = 0
+    return {
+        'app_mode': fields['app_mode'],
+        'step': fields['step'],
+        'product_type': fields['product_type'],
+        'product_stage': fields['product_stage'],
+        'market_type': fields['market_type'],
+        'segment_mask': segment_mask & codec.segments.valid,
+        'forces_code': forces_code,
+        'distribution_config': {
+            'customization': fields['customization'],
+            'market_concentration': fields['market_concentration']
+        },
+        'selected_channel': fields['selected_channel'],
+        'target_audience': fields['target_audience'],
+        # Drop bits for tools and segments no longer in the catalog
+        'activity_mask': value & codec.activities.valid
+    }
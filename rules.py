@@ -0,0 +1,107 @@
+# rules.py - Declarative rule tables compiled to dispatch maps, with incremental evaluation
+from collections import defaultdict
+from typing import NamedTuple
+
+
+class Rule(NamedTuple):
+    output: str
+    # ((field, value), ...) that must all hold; () always applies
+    when: tuple
+    value: object
+
+
+class RuleSet:
+    """Rules compiled per output.
+
+    Scalar outputs take the value of the first matching rule in table order,
+    or their default. List outputs collect every matching value in table
+    order. Each rule is filed under its first condition, so evaluating an
+    output looks up only the rules whose first condition the facts satisfy.
+    """
+
+    def __init__(self, rules, defaults=None, lists=()):
+        self.rules = tuple(rules)
+        self.defaults = dict(defaults or {})
+        self.lists = frozenset(lists)
+        self.outputs = tuple(dict.fromkeys([*self.defaults, *self.lists, *(rule.output for rule in self.rules)]))
+        self._always = defaultdict(list)
+        self._dispatch = defaultdict(lambda: defaultdict(list))
+        self._key_fields = defaultdict(dict)
+        self.readers = defaultdict(list)
+        self._depends = defaultdict(dict)
+        for rule_id, rule in enumerate(self.rules):
+            if not rule.when:
+                self._always[rule.output].append(rule_id)
+                continue
+            field, value = rule.when[0]
+            self._dispatch[rule.output][field, value].append(rule_id)
+            self._key_fields[rule.output][field] = None
+            for field, _ in rule.when:
+                if rule_id not in self.readers[field]:
+                    self.readers[field].append(rule_id)
+                self._depends[rule.output][field] = None
+
+    def depends_on(self, output):
+        """Fact fields that can change ``output``, in first-use order."""
+        return tuple(self._depends[output])
+
+    def tests(self, prefix=''):
+        """Distinct (field, value) conditions on fields starting with ``prefix``, in table order."""
+        return tuple(dict.fromkeys(
+            (field, value) for rule in self.rules for field, value in rule.when if field.startswith(prefix)
+        ))
+
+    def matches(self, rule_id, facts):
+        return all(facts.get(field) == value for field, value in self.rules[rule_id].when)
+
+    def combine(self, output, matched):
+        """Output value from the ids of its matching rules."""
+        if output in self.lists:
+            return tuple(self.rules[rule_id].value for rule_id in sorted(matched))
+        return self.rules[min(matched)].value if matched else self.defaults.get(output)
+
+    def evaluate(self, output, facts):
+        dispatch = self._dispatch[output]
+        candidates = list(self._always[output])
+        for field in self._key_fields[output]:
+            candidates.extend(dispatch.get((field, facts.get(field)), ()))
+        return self.combine(output, [rule_id for rule_id in candidates if self.matches(rule_id, facts)])
+
+
+class Evaluation:
+    """All outputs for a set of facts that changes over time.
+
+    update() re-checks only the rules that read a changed field and
+    recombines only the outputs those rules feed.
+    """
+
+    def __init__(self, ruleset, facts=None):
+        self.ruleset = ruleset
+        self.facts = {}
+        self.matched = {output: set(ruleset._always[output]) for output in ruleset.outputs}
+        self.values = {output: ruleset.combine(output, self.matched[output]) for output in ruleset.outputs}
+        self.rules_checked = 0
+        if facts:
+            self.update(facts)
+
+    def update(self, facts):
+        """Apply changed fields (None unsets one); return the set of outputs that were recomputed."""
+        ruleset = self.ruleset
+        changed = [field for field, value in facts.items() if self.facts.get(field) != value]
+        for field in changed:
+            if facts[field] is None:
+                self.facts.pop(field, None)
+            else:
+                self.facts[field] = facts[field]
+        touched = set()
+        for rule_id in {rule_id for field in changed for rule_id in ruleset.readers.get(field, ())}:
+            output = ruleset.rules[rule_id].output
+            if ruleset.matches(rule_id, self.facts):
+                self.matched[output].add(rule_id)
+            else:
+                self.matched[output].discard(rule_id)
+            touched.add(output)
+            self.rules_checked += 1
+        for output in touched:
+            self.values[output] = ruleset.combine(output, self.matched[output])
+        return touched
@@ -0,0 +1,137 @@
+# scenarios.py - Side-by-side plan scenarios, evaluated in parallel with per-scenario result caching
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import catalog
+import engine
+import metrics
+
+MAX_SCENARIOS = 6
+DEFAULT_CACHE_SIZE = 1024
+
+# Outputs compared across scenarios, in display order
+COMPARED_OUTPUTS = ('strategy', 'pricing', 'promotion', 'distribution', 'messaging', 'channel', 'promotion_mix')
+LIST_OUTPUTS = frozenset(('messaging', 'promotion_mix'))
+
+
+class Scenario(NamedTuple):
+    name: str
+    product_type: str = None
+    product_stage: str = None
+    market_type: str = None
+    segmentation: tuple = ()
+    competitive_forces: tuple = ()  # ((force, level), ...)
+    customization: str = None
+    market_concentration: str = None
+    target_audience: str = None
+
+    @property
+    def inputs(self):
+        """Everything but the name; scenarios with equal inputs share one cached result."""
+        return tuple(self[1:])
+
+    @property
+    def distribution_config(self):
+        return {'customization': self.customization, 'market_concentration': self.market_concentration}
+
+
+class ScenarioResult(NamedTuple):
+    recommendations: engine.Recommendation
+    channel: str           # recommended distribution channel name, or None
+    promotion_mix: tuple   # top promotion activity names, best match first
+
+
+class OutputDiff(NamedTuple):
+    output: str
+    values: tuple    # one per scenario
+    differs: bool
+    added: tuple     # per scenario, list items not in the first scenario's (list outputs only)
+    removed: tuple   # per scenario, first-scenario items it lacks
+
+
+def evaluate(scenario):
+    recommendations = engine.get_recommendations(
+        scenario.product_type, scenario.product_stage, scenario.market_type, scenario.segmentation,
+        dict(scenario.competitive_forces), scenario.distribution_config
+    )
+    channel = engine.get_distribution_recommendation(scenario.distribution_config)
+    promotion = engine.get_promotion_recommendations(scenario.target_audience)
+    return ScenarioResult(recommendations, channel['name'] if channel else None,
+                          tuple(rec['tool'] for rec in promotion))
+
+
+def output_value(result, output):
+    if output in ('channel', 'promotion_mix'):
+        return getattr(result, output)
+    return getattr(result.recommendations, output)
+
+
+def diff(results):
+    """An OutputDiff per COMPARED_OUTPUTS entry, measured against the first result."""
+    diffs = []
+    for output in COMPARED_OUTPUTS:
+        values = tuple(output_value(result, output) for result in results)
+        baseline = values[0] if values else None
+        if output in LIST_OUTPUTS and values:
+            added = tuple(tuple(item for item in value if item not in baseline) for value in values)
+            removed = tuple(tuple(item for item in baseline if item not in value) for value in values)
+        else:
+            added = removed = ()
+        diffs.append(OutputDiff(output, values, any(value != baseline for value in values), added, removed))
+    return diffs
+
+
+class ScenarioEvaluator:
+    """Evaluates scenarios on a thread pool, caching each result by its inputs and catalog version.
+
+    Only scenarios missing from the cache are computed, so editing one
+    scenario of a comparison recomputes just that one. Concurrent requests
+    for the same inputs share a job.
+    """
+
+    def __init__(self, max_workers=4, cache_size=DEFAULT_CACHE_SIZE, registry=metrics.REGISTRY):
+        self.cache_size = cache_size
+        self.registry = registry
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scenario')
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._jobs = {}
+
+    def _run(self, key, scenario):
+        try:
+            result = evaluate(scenario)
+        except BaseException:
+            with self._lock:
+                self._jobs.pop(key, None)
+            raise
+        with self._lock:
+            self._jobs.pop(key, None)
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def evaluate_all(self, scenarios):
+        """Return (a ScenarioResult per scenario, how many had to be computed)."""
+        version = catalog.current().version
+        keys = [(version, scenario.inputs) for scenario in scenarios]
+        results, jobs = {}, {}
+        with self._lock:
+            for key, scenario in zip(keys, scenarios):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[key] = self._cache[key]
+                elif key not in jobs:
+                    if key not in self._jobs:
+                        self._jobs[key] = self._pool.submit(self._run, key, scenario)
+                    jobs[key] = self._jobs[key]
+        for key, job in jobs.items():
+            results[key] = job.result()
+        if jobs:
+            self.registry.inc('scenario_evaluations', len(jobs))
+        return [results[key] for key in keys], len(jobs)
+
+    def shutdown(self):
+        self._pool.shutdown(cancel_futures=True)
@@ -0,0 +1,112 @@
+# scoring.py - Vectorized promotion-mix scoring over the communication tool catalog
+import numpy as np
+
+FOCUS_WEIGHTS = {'Largely': 3, 'Partly': 1}
+
+# Audience modes, used as row indices into the score matrix
+CUSTOMER, PARTNER, MIXED = 0, 1, 2
+
+REASONING = {
+    (CUSTOMER, 3): 'Highly effective for customer-centric approach',
+    (CUSTOMER, 1): 'Moderately effective for customers',
+    (PARTNER, 3): 'Highly effective for partner-centric approach',
+    (PARTNER, 1): 'Moderately effective for partners',
+    (MIXED, 3): 'Balanced approach for mixed audience',
+    (MIXED, 1): 'Balanced approach for mixed audience'
+}
+
+
+def audience_mode(audience):
+    """Classify a target audience label, or return None when it is empty."""
+    if not audience:
+        return None
+    focus_lower = audience.lower()
+    if 'customer' in focus_lower or 'b2c' in focus_lower:
+        return CUSTOMER
+    if 'partner' in focus_lower or 'b2b' in focus_lower:
+        return PARTNER
+    return MIXED
+
+
+class PromotionScorer:
+    """Catalog encoded once as weight vectors; scoring is a row lookup plus top-k."""
+
+    def __init__(self, tools):
+        self.names = list(tools)
+        self.details = list(tools.values())
+        n = len(self.names)
+        partner = np.array([FOCUS_WEIGHTS.get(d['partner'], 0) for d in self.details], dtype=np.int64)
+        customer = np.array([FOCUS_WEIGHTS.get(d['customer'], 0) for d in self.details], dtype=np.int64)
+        self.type_names, self.type_codes = np.unique([d['type'] for d in self.details], return_inverse=True)
+        self.scores = np.vstack([customer, partner, np.maximum(customer, partner)])
+        # Tools worth recommending (score > 0) per audience mode
+        self.recommendable = np.count_nonzero(self.scores, axis=1)
+        # Unique rank key: score first, then catalog order, so ties resolve
+        # exactly like a stable descending sort on score.
+        self._rank = self.scores * n + np.arange(n - 1, -1, -1)
+        # (mode, k) -> ranked (indices, scores); the scorer is immutable, so
+        # each audience mode only ever needs ranking once per k
+        self._ranked = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def top_k(self, modes, k):
+        """Return (indices, scores) of the k best tools for each mode, best first."""
+        # Only three distinct modes exist, so rank each one once and broadcast.
+        unique, inverse = np.unique(np.asarray(modes, dtype=np.intp), return_inverse=True)
+        k = min(k, len(self))
+        if k <= 0:
+            empty = np.empty((len(inverse), 0), dtype=np.intp)
+            return empty, empty
+        rank = self._rank[unique]
+        if k < rank.shape[1]:
+            top = np.argpartition(-rank, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(rank.shape[1]), rank.shape)
+        order = np.argsort(-np.take_along_axis(rank, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return top[inverse], self.scores[unique[:, None], top][inverse]
+
+    def _materialize(self, mode, indices, scores):
+        return [
+            {
+                'tool': self.names[i],
+                'score': int(score),
+                'reasoning': REASONING[mode, int(score)],
+                **self.details[i]
+            }
+            for i, score in zip(indices.tolist(), scores.tolist()) if score > 0
+        ]
+
+    def recommend(self, target_audience, limit=12):
+        return self.recommend_many([target_audience], limit)[0]
+
+    def recommend_page(self, target_audience, page, page_size):
+        """Return (recommendations on ``page``, total recommendable tools); only that page is materialized."""
+        mode = audience_mode(target_audience)
+        if mode is None:
+            return [], 0
+        # Zero-score tools rank last, so the first ``recommendable`` positions are the full list
+        indices, scores = self.ranked(mode, len(self))
+        start = page * page_size
+        return self._materialize(mode, indices[start:start + page_size], scores[start:start + page_size]), \
+            int(self.recommendable[mode])
+
+    def ranked(self, mode, k):
+        try:
+            return self._ranked[mode, k]
+        except KeyError:
+            top, scores = self.top_k([mode], k)
+            self._ranked[mode, k] = result = (top[0], scores[0])
+            return result
+
+    def recommend_many(self, audiences, limit=12):
+        modes = [audience_mode(audience) for audience in audiences]
+        # One vectorized top-k over the distinct modes not ranked for this k yet
+        missing = [mode for mode in dict.fromkeys(modes) if mode is not None and (mode, limit) not in self._ranked]
+        if missing:
+            top, scores = self.top_k(missing, limit)
+            for row, mode in enumerate(missing):
+                self._ranked[mode, limit] = (top[row], scores[row])
+        return [[] if mode is None else self._materialize(mode, *self._ranked[mode, limit]) for mode in modes]
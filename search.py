@@ -0,0 +1,116 @@
+# search.py - Inverted index and prefix trie over the promotion tool catalog
+import re
+from collections import defaultdict
+
+import catalog
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Field weights: matches in a tool's own name rank above matches in its
+# resources, and names rank above descriptions
+TOOL_NAME_WEIGHT = 3.0
+TOOL_TYPE_WEIGHT = 2.0
+RESOURCE_NAME_WEIGHT = 2.0
+RESOURCE_DESC_WEIGHT = 1.0
+
+# Score multiplier for a prefix-only (not whole-word) match
+PREFIX_FACTOR = 0.6
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class PrefixTrie:
+    """Maps a prefix to every indexed term that starts with it."""
+
+    def __init__(self, terms):
+        self.root = {}
+        for term in terms:
+            node = self.root
+            for char in term:
+                node = node.setdefault(char, {})
+            node[''] = term
+        self._completions = {}
+        self._collect(self.root, '')
+
+    def _collect(self, node, prefix):
+        # Precompute completions per node so lookups never walk subtrees
+        terms = [node['']] if '' in node else []
+        for char, child in node.items():
+            if char:
+                terms.extend(self._collect(child, prefix + char))
+        self._completions[prefix] = tuple(terms)
+        return terms
+
+    def complete(self, prefix):
+        return self._completions.get(prefix, ())
+
+
+class SearchIndex:
+    """Ranked search over tools and their design resources for one catalog version.
+
+    Each tool and each resource is a document. A query matches documents
+    containing every query word as a whole word or a word prefix.
+    """
+
+    def __init__(self, cat):
+        self.documents = []
+        postings = defaultdict(dict)
+
+        def add(doc_id, text, weight):
+            for term in tokenize(text):
+                postings[term][doc_id] = max(postings[term].get(doc_id, 0.0), weight)
+
+        for tool, details in cat.communication_tools.items():
+            doc_id = len(self.documents)
+            self.documents.append({'tool': tool, 'type': details['type'], 'resource': None})
+            add(doc_id, tool, TOOL_NAME_WEIGHT)
+            add(doc_id, details['type'].replace('-', ' '), TOOL_TYPE_WEIGHT)
+            for resource in details['resources']:
+                doc_id = len(self.documents)
+                self.documents.append({'tool': tool, 'type': details['type'], 'resource': resource})
+                add(doc_id, resource['name'], RESOURCE_NAME_WEIGHT)
+                add(doc_id, resource['desc'], RESOURCE_DESC_WEIGHT)
+
+        self.postings = dict(postings)
+        self.trie = PrefixTrie(self.postings)
+
+    def _term_scores(self, word):
+        scores = {}
+        for term in self.trie.complete(word):
+            factor = 1.0 if term == word else PREFIX_FACTOR
+            for doc_id, weight in self.postings[term].items():
+                if weight * factor > scores.get(doc_id, 0.0):
+                    scores[doc_id] = weight * factor
+        return scores
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` documents as dicts with a 'score', best first."""
+        words = tokenize(query)
+        if not words:
+            return []
+        totals = None
+        # Intersect the rarest word first to keep the candidate set small
+        for scores in sorted((self._term_scores(word) for word in words), key=len):
+            if totals is None:
+                totals = scores
+            else:
+                totals = {doc_id: total + scores[doc_id] for doc_id, total in totals.items() if doc_id in scores}
+            if not totals:
+                return []
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{**self.documents[doc_id], 'score': score} for doc_id, score in ranked]
+
+    def suggest(self, prefix, limit=5):
+        """Complete the last word of ``prefix`` to indexed terms, most common first."""
+        words = tokenize(prefix)
+        if not words or not prefix[-1:].isalnum():
+            return []
+        terms = self.trie.complete(words[-1])
+        return sorted(terms, key=lambda term: (-len(self.postings[term]), term))[:limit]
+
+
+def search_index(cat=None):
+    """The SearchIndex for the live catalog; built once per version and shared by all sessions."""
+    return (cat or catalog.current()).derived(SearchIndex)
@@ -0,0 +1,102 @@
+# sensitivity.py - How recommendations respond to every Porter force combination
+import itertools
+from typing import NamedTuple
+
+import numpy as np
+
+import catalog
+import engine
+from catalog import COMPETITIVE_FORCES, FORCE_LEVELS, PRODUCT_STAGES
+
+FORCE_KEYS = tuple(key for key, _ in COMPETITIVE_FORCES)
+
+
+class ForceGrid:
+    """All len(FORCE_LEVELS) ** len(FORCES) complete ratings, with their index offsets for one catalog version."""
+
+    def __init__(self, cat):
+        axes = cat.derived(engine.StateAxes)
+        self.ratings = tuple(
+            dict(zip(FORCE_KEYS, levels)) for levels in itertools.product(FORCE_LEVELS, repeat=len(FORCE_KEYS))
+        )
+        # Forces only reach the index through force_mask(), so each rating is
+        # an offset from the same state with no forces rated
+        self.offsets = np.array([engine.force_mask(r, axes) for r in self.ratings], dtype=np.int64) * axes.segment_masks
+
+    def __len__(self):
+        return len(self.ratings)
+
+
+def grid(cat=None):
+    return (cat or catalog.current()).derived(ForceGrid)
+
+
+class ForceChange(NamedTuple):
+    force: str
+    level: str
+    changed: tuple   # Recommendation fields that differ from the baseline
+    added: tuple     # messages gained
+    removed: tuple   # messages lost
+
+
+class Sensitivity(NamedTuple):
+    baseline: engine.Recommendation
+    # One entry per (force, level) that differs from the current rating
+    single_changes: tuple
+    # Share of the whole grid whose outcome differs from the baseline, and distinct outcomes
+    changed_share: float
+    distinct_outcomes: int
+    # (stage, product_type) -> (changed share, distinct outcomes) when stages/types are
+    # varied, each measured against that cell's outcome for the current rating
+    cells: dict
+
+
+def _diff(baseline, other):
+    changed = tuple(field for field in engine.Recommendation._fields if getattr(baseline, field) != getattr(other, field))
+    added = tuple(msg for msg in other.messaging if msg not in baseline.messaging)
+    removed = tuple(msg for msg in baseline.messaging if msg not in other.messaging)
+    return changed, added, removed
+
+
+def _grid_outcomes(index, base_key, offsets):
+    return [index[key] for key in (base_key + offsets).tolist()]
+
+
+def explore(product_type=None, product_stage=None, market_type=None, segmentation=(),
+            competitive_forces=None, distribution_config=None, vary_stage=False, vary_type=False):
+    """Evaluate every force rating for a plan, optionally across all stages and product types."""
+    cat = catalog.current()
+    index = engine.recommendation_index(cat)
+    axes = cat.derived(engine.StateAxes)
+    offsets = grid(cat).offsets
+    competitive_forces = dict(competitive_forces or {})
+
+    def base_key(pt, stage):
+        return engine.encode_state(pt, stage, market_type, segmentation, {}, distribution_config, axes)
+
+    current = engine.force_mask(competitive_forces, axes) * axes.segment_masks
+    baseline = index[base_key(product_type, product_stage) + current]
+
+    single_changes = []
+    for force in FORCE_KEYS:
+        for level in FORCE_LEVELS:
+            if competitive_forces.get(force) == level:
+                continue
+            rating = {**competitive_forces, force: level}
+            other = index[base_key(product_type, product_stage) + engine.force_mask(rating, axes) * axes.segment_masks]
+            single_changes.append(ForceChange(force, level, *_diff(baseline, other)))
+
+    outcomes = _grid_outcomes(index, base_key(product_type, product_stage), offsets)
+    changed_share = sum(outcome != baseline for outcome in outcomes) / len(outcomes)
+
+    cells = {}
+    stages = PRODUCT_STAGES if vary_stage else [product_stage]
+    types = list(cat.product_types) if vary_type else [product_type]
+    if vary_stage or vary_type:
+        for stage, pt in itertools.product(stages, types):
+            key = base_key(pt, stage)
+            cell_baseline = index[key + current]
+            cell = _grid_outcomes(index, key, offsets)
+            cells[stage, pt] = (sum(outcome != cell_baseline for outcome in cell) / len(cell), len(set(cell)))
+
+    return Sensitivity(baseline, tuple(single_changes), changed_share, len(set(outcomes)), cells)
@@ -0,0 +1,245 @@
+# simulation.py - Monte Carlo reach, conversion and cost outcomes for a promotion mix
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+# Draws per batch; also the unit of work sent to each worker process
+CHUNK_DRAWS = 100_000
+# Runs up to this size are computed inline rather than on the process pool
+INLINE_DRAWS = CHUNK_DRAWS
+
+# People reached per point of expected response from the budget curves
+REACH_PER_POINT = 1000
+# Log-scale spread of reach around its expected value, and of cost overruns
+REACH_SIGMA = 0.35
+COST_SIGMA = 0.15
+# Mean conversion rate by audience fit score; Beta concentration around it
+BASE_CONVERSION = {3: 0.03, 1: 0.015, 0: 0.005}
+CONVERSION_CONCENTRATION = 200.0
+
+OUTCOMES = ('reach', 'conversions', 'cost', 'cost_per_conversion')
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 30
+
+# Jobs keep log-spaced histograms instead of raw draws: SKETCH_BINS bins across
+# SKETCH_DECADES decades either side of each outcome's expected value, so
+# percentiles are within about 0.25% of the exact ones
+SKETCH_DECADES = 3
+SKETCH_BINS = 6000
+
+
+class MixModel(NamedTuple):
+    tools: tuple
+    spend: np.ndarray       # planned spend per tool
+    reach: np.ndarray       # median people reached per tool
+    conversion: np.ndarray  # mean conversion rate per tool
+
+
+def build_model(tools, spend, expected_response, fit_scores, stage_weights):
+    """MixModel from a budget allocation, audience fit scores (0/1/3) and stage weights per tool."""
+    conversion = np.array([BASE_CONVERSION.get(int(score), BASE_CONVERSION[0]) for score in fit_scores])
+    return MixModel(
+        tuple(tools),
+        np.asarray(spend, dtype=np.float64),
+        np.asarray(expected_response, dtype=np.float64) * REACH_PER_POINT,
+        np.clip(conversion * np.asarray(stage_weights, dtype=np.float64), 1e-4, 0.5),
+    )
+
+
+def simulate_chunk(model, seed, draws):
+    """Return a (4, draws) float32 array of reach, conversions, cost and cost per conversion."""
+    rng = np.random.default_rng(seed)
+    shape = (draws, len(model.tools))
+    reach = model.reach * rng.lognormal(0.0, REACH_SIGMA, shape)
+    conversion = rng.beta(model.conversion * CONVERSION_CONCENTRATION,
+                          (1 - model.conversion) * CONVERSION_CONCENTRATION, shape)
+    # Mean-one multiplicative overruns, so expected cost equals planned spend
+    cost = model.spend * rng.lognormal(-COST_SIGMA ** 2 / 2, COST_SIGMA, shape)
+
+    total_reach = reach.sum(axis=1)
+    conversions = np.einsum('ij,ij->i', reach, conversion)
+    total_cost = cost.sum(axis=1)
+    per_conversion = np.divide(total_cost, conversions, out=np.full(draws, np.nan), where=conversions > 0)
+    return np.stack([total_reach, conversions, total_cost, per_conversion]).astype(np.float32)
+
+
+def summarize(outcomes):
+    """{outcome: {'mean': .., 'p5': .., ...}} over the columns of simulate_chunk() output."""
+    if outcomes.shape[1] == 0:
+        return {}
+    points = np.nanpercentile(outcomes, PERCENTILES, axis=1)
+    means = np.nanmean(outcomes, axis=1)
+    return {
+        name: {'mean': float(means[i]), **{f'p{p}': float(points[j, i]) for j, p in enumerate(PERCENTILES)}}
+        for i, name in enumerate(OUTCOMES)
+    }
+
+
+def expected_outcomes(model):
+    """Rough expected value of each outcome; centres the histograms of a SimulationJob."""
+    reach = model.reach * math.exp(REACH_SIGMA ** 2 / 2)
+    conversions = float((reach * model.conversion).sum())
+    cost = float(model.spend.sum())
+    return float(reach.sum()), conversions, cost, cost / conversions if conversions else cost
+
+
+class OutcomeSketch:
+    """Per-outcome count, sum, min, max and a fixed log-spaced histogram; chunks are folded in and dropped.
+
+    Bin edges depend only on the scales, and counts, min and max are
+    order-independent, so results don't depend on the order chunks arrive in.
+    """
+
+    def __init__(self, scales):
+        scales = np.maximum(np.asarray(scales, dtype=np.float64), np.finfo(np.float64).tiny)
+        self.log_low = np.log10(scales) - SKETCH_DECADES
+        self.bin_width = 2 * SKETCH_DECADES / SKETCH_BINS
+        # Column 0 holds values below the range, the last column values above it
+        self.counts = np.zeros((len(OUTCOMES), SKETCH_BINS + 2), dtype=np.int64)
+        self.low = np.full(len(OUTCOMES), np.inf)
+        self.high = np.full(len(OUTCOMES), -np.inf)
+        # Per-chunk sums, added with fsum so the total is exact whatever the order
+        self._sums = []
+
+    def add(self, chunk):
+        sums = []
+        for i, values in enumerate(chunk):
+            values = values[~np.isnan(values)].astype(np.float64)
+            sums.append(float(values.sum()))
+            if not values.size:
+                continue
+            self.low[i] = min(self.low[i], values.min())
+            self.high[i] = max(self.high[i], values.max())
+            with np.errstate(divide='ignore'):
+                position = np.floor((np.log10(values) - self.log_low[i]) / self.bin_width)
+            self.counts[i] += np.bincount(np.clip(position, -1, SKETCH_BINS).astype(np.int64) + 1,
+                                          minlength=SKETCH_BINS + 2)
+        self._sums.append(sums)
+
+    def count(self, i):
+        return int(self.counts[i].sum())
+
+    def mean(self, i):
+        n = self.count(i)
+        return math.fsum(sums[i] for sums in self._sums) / n if n else float('nan')
+
+    def percentile(self, i, p):
+        """Like np.nanpercentile, interpolating within the bin that holds the rank."""
+        n = self.count(i)
+        if not n:
+            return float('nan')
+        rank = p / 100 * (n - 1)
+        cumulative = np.cumsum(self.counts[i])
+        b = int(np.searchsorted(cumulative, rank, side='right'))
+        if b == 0:
+            return float(self.low[i])
+        if b > SKETCH_BINS:
+            return float(self.high[i])
+        fraction = (rank - cumulative[b - 1] + 0.5) / self.counts[i, b]
+        value = 10 ** (self.log_low[i] + (b - 1 + fraction) * self.bin_width)
+        return float(np.clip(value, self.low[i], self.high[i]))
+
+    def summary(self):
+        """{outcome: {'mean': .., 'p5': .., ...}}, as summarize() gives for the raw draws."""
+        return {
+            name: {'mean': self.mean(i), **{f'p{p}': self.percentile(i, p) for p in PERCENTILES}}
+            for i, name in enumerate(OUTCOMES)
+        }
+
+    def histogram(self, outcome, bins=HISTOGRAM_BINS):
+        """(counts, edges) over ``bins`` equal-width bins from the smallest to the largest draw."""
+        i = OUTCOMES.index(outcome)
+        low, high = (self.low[i], self.high[i]) if self.count(i) else (0.0, 1.0)
+        if high <= low:
+            low, high = low - 0.5, high + 0.5
+        centres = 10 ** (self.log_low[i] + (np.arange(SKETCH_BINS) + 0.5) * self.bin_width)
+        values = np.concatenate([[low], np.clip(centres, low, high), [high]])
+        counts, edges = np.histogram(values, bins=bins, range=(low, high), weights=self.counts[i])
+        return counts.astype(np.int64), edges
+
+
+class SimulationSummary(NamedTuple):
+    draws: int
+    stats: dict               # summary() of the draws so far
+    histogram: tuple          # (counts, edges) of conversions
+
+
+class SimulationJob:
+    """Folds chunk results into an OutcomeSketch as they arrive; safe to read while workers are running."""
+
+    def __init__(self, total_draws, scales):
+        self.total_draws = total_draws
+        self._lock = threading.Lock()
+        self._sketch = OutcomeSketch(scales)
+        self._summary = None
+        self._done = 0
+        self._futures = []
+        self.error = None
+        self.cancelled = False
+
+    def _add_future(self, future):
+        if self.cancelled or future.cancelled():
+            return
+        if future.exception() is not None:
+            self.error = str(future.exception())
+        else:
+            self._add_result(future.result())
+
+    def _add_result(self, chunk):
+        with self._lock:
+            self._sketch.add(chunk)
+            self._done += chunk.shape[1]
+            self._summary = None
+
+    @property
+    def completed_draws(self):
+        return self._done
+
+    @property
+    def finished(self):
+        return self.error is not None or self.cancelled or self._done >= self.total_draws
+
+    def cancel(self):
+        """Drop the chunks still queued on the shared pool; ones already running finish unused."""
+        self.cancelled = True
+        for future in self._futures:
+            future.cancel()
+
+    def summary(self):
+        """SimulationSummary of the draws so far, or None before the first chunk; cached until the next one."""
+        with self._lock:
+            if self._summary is None and self._done:
+                self._summary = SimulationSummary(self._done, self._sketch.summary(),
+                                                  self._sketch.histogram('conversions'))
+            return self._summary
+
+
+class Simulator:
+    """Runs simulations, spreading large ones across a process pool in CHUNK_DRAWS batches."""
+
+    def __init__(self, max_workers=None):
+        # spawn: forking a multi-threaded server process is unsafe
+        self._pool = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def start(self, model, draws, seed=0):
+        """Begin a run of ``draws`` and return its SimulationJob without waiting."""
+        sizes = [CHUNK_DRAWS] * (draws // CHUNK_DRAWS) + ([draws % CHUNK_DRAWS] if draws % CHUNK_DRAWS else [])
+        # One child seed per chunk, so results do not depend on the worker count
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        job = SimulationJob(draws, expected_outcomes(model))
+        if draws <= INLINE_DRAWS:
+            for child, size in zip(seeds, sizes):
+                job._add_result(simulate_chunk(model, child, size))
+            return job
+        for child, size in zip(seeds, sizes):
+            future = self._pool.submit(simulate_chunk, model, child, size)
+            job._futures.append(future)
+            future.add_done_callback(job._add_future)
+        return job
+
+    def shutdown(self):
+        self._pool.shutdown(cancel_futures=True)
@@ -0,0 +1,34 @@
+# conftest.py - Makes the app's top-level modules importable and gives tests a private catalog copy
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import catalog  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A copy of data/ served as the live catalog, re-checked for changes on every call."""
+    directory = tmp_path / 'data'
+    shutil.copytree(catalog.CATALOG_DIR, directory)
+    monkeypatch.setattr(catalog, 'CATALOG_DIR', directory)
+    monkeypatch.setattr(catalog, 'RELOAD_CHECK_INTERVAL', 0)
+    monkeypatch.setattr(catalog, '_current', None)
+    monkeypatch.setattr(catalog, '_rejected', None)
+    monkeypatch.setattr(catalog, 'last_reload_error', None)
+    # As the app's prewarm does, so the first version holds every section
+    catalog.current().load_all()
+    return directory
+
+
+def save_data(path, data, bump):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    # A distinct mtime even on filesystems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 10**9))
@@ -0,0 +1,76 @@
+# test_budget.py - Budget allocation spends the whole budget at equal marginal returns
+import random
+
+import numpy as np
+import pytest
+
+import catalog
+from budget import BudgetOptimizer
+from catalog import AUDIENCE_OPTIONS, PRODUCT_STAGES
+from scoring import PromotionScorer
+
+
+@pytest.fixture(scope='module')
+def optimizer():
+    tools = catalog.current().communication_tools
+    return BudgetOptimizer(tools, PromotionScorer(tools))
+
+
+def random_mixes(optimizer, count, seed=3):
+    rng = random.Random(seed)
+    names = list(optimizer.index)
+    for _ in range(count):
+        yield (rng.sample(names, rng.randint(1, len(names))), rng.choice([100, 5_000, 50_000, 2_000_000]),
+               rng.choice([None, *PRODUCT_STAGES]), rng.choice([None, *AUDIENCE_OPTIONS]))
+
+
+def curves(optimizer, tools, stage, audience):
+    """(weighted reach, scale) per tool; a saturating budget returns a tool's full reach."""
+    reach = np.array([optimizer.allocate([tool], 1e12, stage, audience).total_response for tool in tools])
+    return reach, optimizer.scale[[optimizer.index[tool] for tool in tools]]
+
+
+def test_whole_budget_is_spent_and_never_negative(optimizer):
+    for tools, budget, stage, audience in random_mixes(optimizer, 300):
+        allocation = optimizer.allocate(tools, budget, stage, audience)
+        assert allocation.tools == tools
+        assert np.all(allocation.spend >= 0)
+        assert allocation.spend.sum() == pytest.approx(budget, rel=1e-9)
+        assert allocation.total_response == pytest.approx(allocation.response.sum())
+
+
+def test_funded_tools_share_one_marginal_return(optimizer):
+    for tools, budget, stage, audience in random_mixes(optimizer, 100):
+        allocation = optimizer.allocate(tools, budget, stage, audience)
+        reach, scale = curves(optimizer, tools, stage, audience)
+        marginal = reach / scale * np.exp(-allocation.spend / scale)
+        funded = allocation.spend > 0
+        assert marginal[funded] == pytest.approx(np.full(funded.sum(), allocation.marginal_return), rel=1e-6)
+        # An unfunded tool's first unit would return no more than the funded ones' last
+        assert np.all(marginal[~funded] <= allocation.marginal_return * (1 + 1e-9))
+
+
+def test_moving_spend_between_tools_never_helps(optimizer):
+    rng = np.random.default_rng(5)
+    for tools, budget, stage, audience in random_mixes(optimizer, 50):
+        if len(tools) < 2:
+            continue
+        allocation = optimizer.allocate(tools, budget, stage, audience)
+        reach, scale = curves(optimizer, tools, stage, audience)
+        for _ in range(5):
+            i, j = rng.choice(len(tools), 2, replace=False)
+            shift = min(allocation.spend[i], budget * 0.01)
+            spend = allocation.spend.copy()
+            spend[i] -= shift
+            spend[j] += shift
+            moved = (reach * (1 - np.exp(-spend / scale))).sum()
+            assert moved <= allocation.total_response * (1 + 1e-12)
+
+
+def test_no_budget_spends_nothing(optimizer):
+    tools = list(optimizer.index)[:4]
+    for budget in (0, -100):
+        allocation = optimizer.allocate(tools, budget)
+        assert not allocation.spend.any()
+        assert allocation.total_response == 0.0
+    assert optimizer.allocate([], 1000).tools == []
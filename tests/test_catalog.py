@@ -0,0 +1,59 @@
+# test_catalog.py - Hot reload keeps serving the last good catalog version
+import json
+
+import pytest
+
+import catalog
+import engine
+import metrics
+from conftest import save_data
+
+
+def reload_errors():
+    return metrics.REGISTRY.snapshot()['counters'].get('catalog_reload_errors', 0)
+
+
+def test_tool_without_type_is_rejected(data_dir):
+    path = data_dir / 'communication_tools.json'
+    tools = json.loads(path.read_text(encoding='utf-8'))
+    good = catalog.current()
+    expected = engine.get_promotion_recommendations('Customer Centric (B2C)')
+    errors = reload_errors()
+
+    broken = json.loads(json.dumps(tools))
+    del broken[next(iter(broken))]['type']
+    save_data(path, broken, bump=1)
+
+    assert catalog.current() is good
+    assert "missing type" in catalog.last_reload_error
+    assert reload_errors() == errors + 1
+    assert engine.get_promotion_recommendations('Customer Centric (B2C)') == expected
+
+    # Fixing the file swaps in a new version
+    save_data(path, tools, bump=2)
+    assert catalog.current() is not good
+    assert catalog.last_reload_error is None
+
+
+@pytest.mark.parametrize('response', [{'reach': 0}, {'scale': -5}, {'reach': '100'}, []])
+def test_bad_response_curve_is_rejected(data_dir, response):
+    path = data_dir / 'communication_tools.json'
+    tools = json.loads(path.read_text(encoding='utf-8'))
+    good = catalog.current()
+    tools[next(iter(tools))]['response'] = response
+    save_data(path, tools, bump=1)
+
+    assert catalog.current() is good
+    assert 'response' in catalog.last_reload_error
+
+
+def test_duplicate_id_is_rejected(data_dir):
+    path = data_dir / 'market_types.json'
+    markets = json.loads(path.read_text(encoding='utf-8'))
+    good = catalog.current()
+    first, second = list(markets)[:2]
+    markets[second]['id'] = markets[first]['id']
+    save_data(path, markets, bump=1)
+
+    assert catalog.current() is good
+    assert 'share id' in catalog.last_reload_error
@@ -0,0 +1,114 @@
+# test_link_health.py - check_urls and LinkMonitor against a local HTTP server
+import asyncio
+import socket
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import urllib3
+
+import link_health
+
+
+class Handler(BaseHTTPRequestHandler):
+    # path -> (HEAD status, GET status)
+    ROUTES = {
+        '/ok': (200, 200),
+        '/head-rejected': (405, 200),
+        '/missing': (404, 404),
+    }
+
+    def _respond(self, method):
+        self.server.hits[method, self.path] += 1
+        head, get = self.ROUTES.get(self.path, (404, 404))
+        self.send_response(head if method == 'HEAD' else get)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._respond('HEAD')
+
+    def do_GET(self):
+        self._respond('GET')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.hits = Counter()
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f'http://127.0.0.1:{server.server_address[1]}{path}'
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f'http://127.0.0.1:{port}/'
+
+
+def fast_pool():
+    # No retries or backoff, so the unreachable case fails at once
+    return urllib3.PoolManager(retries=False, timeout=urllib3.Timeout(total=2))
+
+
+def fast_limiter():
+    return link_health.HostLimiter(interval=0)
+
+
+def check(urls):
+    return asyncio.run(link_health.check_urls(urls, fast_pool(), fast_limiter()))
+
+
+def test_check_urls_classifies_responses(server):
+    ok, missing = url(server, '/ok'), url(server, '/missing')
+    results = check([ok, missing, ok])
+    assert list(results) == [ok, missing]
+    assert results[ok][:2] == ('ok', 200)
+    assert results[missing][:2] == ('broken', 404)
+    assert server.hits['HEAD', '/ok'] == 1
+    assert server.hits['GET', '/ok'] == 0
+
+
+def test_check_urls_falls_back_to_get_when_head_is_rejected(server):
+    target = url(server, '/head-rejected')
+    assert check([target])[target][:2] == ('ok', 200)
+    assert server.hits['HEAD', '/head-rejected'] == 1
+    assert server.hits['GET', '/head-rejected'] == 1
+
+
+def test_check_urls_reports_unreachable_hosts():
+    target = closed_port_url()
+    assert check([target])[target][:2] == ('unreachable', None)
+
+
+def test_link_monitor_serves_cached_results_until_they_expire(server):
+    now = [0.0]
+    monitor = link_health.LinkMonitor(ttl=60, http=fast_pool(), limiter=fast_limiter())
+    monitor.cache = link_health.TTLCache(60, clock=lambda: now[0])
+    target = url(server, '/ok')
+
+    assert monitor.status(target) is None
+    monitor.refresh([target]).result(timeout=5)
+    assert monitor.status(target).status == 'ok'
+
+    # Fresh results are served without another request
+    now[0] = 59
+    assert monitor.refresh([target]) is None
+    assert monitor.status(target).status == 'ok'
+    assert server.hits['HEAD', '/ok'] == 1
+
+    now[0] = 60
+    assert monitor.status(target) is None
+    monitor.refresh([target]).result(timeout=5)
+    assert server.hits['HEAD', '/ok'] == 2
@@ -0,0 +1,122 @@
+# test_plan_state.py - Packed session masks and shareable plan tokens
+import itertools
+import json
+import random
+
+import pytest
+
+import catalog
+import plan_state
+from catalog import AUDIENCE_OPTIONS, PRODUCT_STAGES
+from conftest import save_data
+from plan_state import APP_MODES, FORCES, Bitmask, ForceLevels, decode_plan, encode_plan
+
+ENTRIES = {'a': {'id': 0}, 'b': {'id': 5}, 'c': {'id': 2}}
+
+
+def test_bitmask_uses_one_bit_per_stable_id():
+    mask = Bitmask(ENTRIES)
+    value = mask.add(mask.add(0, 'a'), 'b')
+    assert value == 0b100001
+    assert mask.members(value) == ['a', 'b']
+    assert mask.count(value) == 2
+    assert mask.contains(value, 'b') and not mask.contains(value, 'c')
+    assert not mask.contains(value, 'unknown')
+
+    value = mask.toggle(mask.toggle(value, 'c'), 'a')
+    assert mask.members(value) == ['b', 'c']
+    assert mask.remove(value, 'b') == mask.from_keys(['c'])
+    assert mask.assign(value, 'a', True) == mask.from_keys(['a', 'b', 'c'])
+    assert mask.from_keys(['b', 'unknown']) == 1 << 5
+
+
+def test_bitmask_ignores_bits_of_removed_entries():
+    old = Bitmask(ENTRIES)
+    value = old.from_keys(['a', 'b', 'c'])
+    new = Bitmask({key: entry for key, entry in ENTRIES.items() if key != 'b'})
+    assert new.members(value) == ['a', 'c']
+    assert new.count(value) == 2
+
+
+def test_force_levels_round_trip_every_rating():
+    levels = (None,) + FORCES.levels
+    for ratings in itertools.product(levels, repeat=len(FORCES.forces)):
+        expected = {force: level for force, level in zip(FORCES.forces, ratings) if level is not None}
+        code = FORCES.from_dict(expected)
+        assert FORCES.to_dict(code) == expected
+        assert FORCES.rated_count(code) == len(expected)
+        assert FORCES.is_complete(code) == (len(expected) == len(FORCES.forces))
+
+
+def test_unrated_force_is_not_low():
+    forces = ForceLevels(['x', 'y'], ['Low', 'High'])
+    code = forces.set(0, 'x', 'Low')
+    assert forces.get(code, 'x') == 'Low'
+    assert forces.get(code, 'y') is None
+    code = forces.set(forces.set(code, 'y', 'High'), 'x', 'High')
+    assert forces.to_dict(code) == {'x': 'High', 'y': 'High'}
+
+
+def random_plan(rng):
+    cat = catalog.current()
+    channels = [example for channel in cat.distribution_channels.values() for example in channel['examples']]
+    activities, segments = plan_state.ACTIVITIES, plan_state.SEGMENTS
+    return {
+        'app_mode': rng.choice(APP_MODES),
+        'step': rng.randint(1, 6),
+        'product_type': rng.choice([None, *cat.product_types]),
+        'product_stage': rng.choice([None, *PRODUCT_STAGES]),
+        'market_type': rng.choice([None, *cat.market_types]),
+        'segment_mask': segments.from_keys(rng.sample(segments.keys, rng.randint(0, len(segments.keys)))),
+        'forces_code': FORCES.from_dict({force: rng.choice(FORCES.levels) for force in FORCES.forces
+                                         if rng.random() < 0.7}),
+        'distribution_config': {'customization': rng.choice([None, 'high', 'low']),
+                                'market_concentration': rng.choice([None, 'concentrated', 'fragmented'])},
+        'selected_channel': rng.choice([None, *channels]),
+        'target_audience': rng.choice([None, *AUDIENCE_OPTIONS]),
+        'activity_mask': activities.from_keys(rng.sample(activities.keys, rng.randint(0, len(activities.keys)))),
+    }
+
+
+def test_plan_token_round_trips():
+    rng = random.Random(7)
+    for _ in range(500):
+        plan = random_plan(rng)
+        token = encode_plan(plan)
+        assert token.startswith(plan_state.PLAN_VERSION)
+        assert decode_plan(token) == plan
+
+
+@pytest.mark.parametrize('token', [None, '', 'p1AQI', plan_state.PLAN_VERSION + '!!', plan_state.PLAN_VERSION + 'A'])
+def test_bad_tokens_decode_to_none(token):
+    assert decode_plan(token) is None
+
+
+def test_token_keeps_its_entries_after_catalog_edits(data_dir):
+    activities, segments = plan_state.ACTIVITIES, plan_state.SEGMENTS
+    kept_tool, removed_tool, other_tool = activities.keys[:3]
+    kept_segment, removed_segment = segments.keys[:2]
+    plan = random_plan(random.Random(1))
+    plan.update(product_type='fmcg', market_type='new-new',
+                activity_mask=activities.from_keys([kept_tool, removed_tool, other_tool]),
+                segment_mask=segments.from_keys([kept_segment, removed_segment]))
+    token = encode_plan(plan)
+    before = catalog.current()
+
+    # Remove one selected tool and segment and reverse the order of the rest
+    for filename, removed, bump in (('communication_tools.json', removed_tool, 1),
+                                    ('segmentation_options.json', removed_segment, 2),
+                                    ('product_types.json', None, 3)):
+        path = data_dir / filename
+        entries = json.loads(path.read_text(encoding='utf-8'))
+        save_data(path, {key: entries[key] for key in reversed(entries) if key != removed}, bump)
+    assert catalog.current() is not before
+
+    decoded = decode_plan(token)
+    assert plan_state.ACTIVITIES.members(decoded['activity_mask']) == [other_tool, kept_tool]
+    assert plan_state.SEGMENTS.members(decoded['segment_mask']) == [kept_segment]
+    # The removed entries' bits are dropped, not carried along
+    assert decoded['activity_mask'] == plan_state.ACTIVITIES.from_keys([kept_tool, other_tool])
+    assert decoded['segment_mask'] == plan_state.SEGMENTS.from_keys([kept_segment])
+    assert {key: value for key, value in decoded.items() if key not in ('activity_mask', 'segment_mask')} == \
+        {key: value for key, value in plan.items() if key not in ('activity_mask', 'segment_mask')}
@@ -0,0 +1,77 @@
+# test_rules.py - Incremental rule evaluation agrees with evaluating from scratch
+import random
+
+import pytest
+
+import engine
+from rules import Evaluation, Rule, RuleSet
+
+
+def scan(ruleset, output, facts):
+    """Reference semantics: walk the whole table in order."""
+    matched = [rule.value for rule in ruleset.rules
+               if rule.output == output and all(facts.get(field) == value for field, value in rule.when)]
+    if output in ruleset.lists:
+        return tuple(matched)
+    return matched[0] if matched else ruleset.defaults.get(output)
+
+
+def fact_domains(ruleset):
+    """Every value each field is tested against, plus unset and a value no rule tests."""
+    domains = {}
+    for field, value in ruleset.tests():
+        domains.setdefault(field, [None, 'untested']).append(value)
+    return domains
+
+
+@pytest.fixture(scope='module')
+def ruleset():
+    return engine.rules()
+
+
+def test_rule_semantics():
+    ruleset = RuleSet([
+        Rule('tone', (('stage', 'Growth'), ('market', 'new')), 'bold'),
+        Rule('tone', (('stage', 'Growth'),), 'steady'),
+        Rule('tips', (), 'always'),
+        Rule('tips', (('market', 'new'),), 'explain'),
+    ], defaults={'tone': 'neutral'}, lists=('tips',))
+    assert ruleset.evaluate('tone', {'stage': 'Growth', 'market': 'new'}) == 'bold'
+    assert ruleset.evaluate('tone', {'stage': 'Growth'}) == 'steady'
+    assert ruleset.evaluate('tone', {}) == 'neutral'
+    assert ruleset.evaluate('tips', {'market': 'new'}) == ('always', 'explain')
+    assert ruleset.depends_on('tone') == ('stage', 'market')
+
+
+def test_evaluate_matches_a_full_scan(ruleset):
+    rng = random.Random(11)
+    domains = fact_domains(ruleset)
+    for _ in range(300):
+        facts = {field: rng.choice(values) for field, values in domains.items()}
+        for output in ruleset.outputs:
+            assert ruleset.evaluate(output, facts) == scan(ruleset, output, facts)
+
+
+def test_incremental_updates_match_a_full_scan(ruleset):
+    rng = random.Random(13)
+    domains = fact_domains(ruleset)
+    evaluation = Evaluation(ruleset)
+    facts = {}
+    for _ in range(500):
+        changes = {field: rng.choice(domains[field]) for field in rng.sample(list(domains), rng.randint(1, 4))}
+        before = dict(evaluation.values)
+        touched = evaluation.update(changes)
+        facts.update(changes)
+        facts = {field: value for field, value in facts.items() if value is not None}
+        assert evaluation.facts == facts
+        assert evaluation.values == {output: scan(ruleset, output, facts) for output in ruleset.outputs}
+        # Only recomputed outputs can change
+        assert {output for output in before if before[output] != evaluation.values[output]} <= touched
+
+
+def test_unchanged_facts_check_no_rules(ruleset):
+    facts = {'product_stage': 'Growth', 'market_type': 'new-new'}
+    evaluation = Evaluation(ruleset, facts)
+    checked = evaluation.rules_checked
+    assert evaluation.update(facts) == set()
+    assert evaluation.rules_checked == checked